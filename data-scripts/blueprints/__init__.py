@@ -5,6 +5,7 @@ import logging
 from blueprints.books import books_bp
 from blueprints.authors import authors_bp
 from blueprints.events import events_bp
+from modules import quota
 
 
 def create_app():
@@ -16,6 +17,9 @@ def create_app():
     # Optionally configure logging
     logging.basicConfig(level=logging.DEBUG)
 
+    # Don't hold a request thread for a whole breaker cooldown.
+    quota.configure(max_wait=quota.REQUEST_MAX_WAIT_SECONDS)
+
     # Register blueprints
     app.register_blueprint(books_bp)  # Book-related routes
     app.register_blueprint(authors_bp)  # Author-related routes
@@ -1,26 +1,45 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from bson.objectid import ObjectId
 from datetime import datetime, timedelta
+import gzip
+import json
 import time
 import logging
 
+from config import Config
+
 from modules.db_utils import (
     get_books_collection,
     delete_book_by_id,
     update_book,
+    bump_catalog_version,
 )
 from modules.book_operations import (
     fetch_unreleased_books_logic,
     fetch_custom_books_logic,
     filter_book_data,
     delete_old_books_logic,
+    refresh_stale_books_logic,
+    build_book_from_payload,
+    payload_update,
+    upsert_books_bulk,
     assign_attributes_to_book_and_author,
 )
 from modules.amazon_api import search_book_by_isbn, extract_data_from_item
+from modules.dedup import index_book, unindex_book
+from modules.quota import report as quota_report
+from modules.response_cache import cached_response
+from modules.serialization import document_response, documents_response
+from modules.snapshot import build_snapshot, build_delta, latest_snapshot, etag_for, snapshot_path
 
 books_bp = Blueprint('books_bp', __name__)
 logger = logging.getLogger(__name__)
 
+# Rows per NLP batch and bulk_write in POST /books/bulk; bounds memory per request.
+BULK_CHUNK_SIZE = getattr(Config, "BULK_CHUNK_SIZE", 100)
+# Upper bound for ?chunk_size=, so a client can't turn the whole payload into one chunk.
+MAX_BULK_CHUNK_SIZE = getattr(Config, "MAX_BULK_CHUNK_SIZE", 500)
+
 
 @books_bp.route('/add_book_by_isbn', methods=['POST'])
 def add_book_by_isbn():
@@ -47,31 +66,10 @@ def add_book_by_isbn():
     """
     try:
         data = request.get_json(force=True)
-        isbn = data.get('isbn')
-        description = data.get('description')
-
-        if not isbn:
-            return jsonify({"error": "ISBN is required."}), 400
-
-        if not description:
-            return jsonify({"error": "Description is required."}), 400
-
-        # Construct the book record directly from the provided JSON payload.
-        book_data = {
-            "ISBN": isbn,
-            "title": data.get("title"),
-            "description": description,
-            "authors": data.get("authors", []),
-            "publisher": data.get("publisher"),
-            "publishedDate": data.get("publishedDate"),
-            "pagecount": data.get("pagecount"),
-            "coverImage": data.get("coverImage"),
-            "amazonAffiliateLink": data.get("amazonAffiliateLink"),
-            "subtitle": data.get("subtitle"),
-            "genres": data.get("genres", []),
-            "mainGenre": data.get("mainGenre"),
-            "favoriteCount": data.get("favoriteCount", 0)
-        }
+        book_data, error = build_book_from_payload(data)
+        if error:
+            return jsonify({"error": error}), 400
+        isbn = book_data["ISBN"]
 
         # Use the provided description (and other fields) to automatically
         # determine themes, tone, and writing styles.
@@ -81,9 +79,12 @@ def add_book_by_isbn():
         books_coll = get_books_collection()
         result = books_coll.update_one(
             {"ISBN": isbn},
-            {"$set": book_data},
+            payload_update(book_data),
             upsert=True
         )
+        bump_catalog_version()
+        # Index the stored book; the payload may leave out title and authors.
+        index_book(books_coll.find_one({"ISBN": isbn}) or book_data)
 
         return jsonify({
             "message": "Book added/updated successfully.",
@@ -97,6 +98,77 @@ def add_book_by_isbn():
         return jsonify({"error": str(e)}), 500
 
 
+def _process_bulk_chunk(chunk):
+    """Validate a chunk of (line number, raw line) pairs and upsert the valid rows."""
+    results = []
+    books = []
+    book_results = []
+    for line_number, raw in chunk:
+        try:
+            book_data, error = build_book_from_payload(json.loads(raw))
+        except ValueError as e:
+            book_data, error = None, f"Invalid JSON: {e}"
+        if error:
+            results.append({"line": line_number, "status": "error", "error": error})
+            continue
+        books.append(book_data)
+        result = {"line": line_number}
+        book_results.append(result)
+        results.append(result)
+    if books:
+        try:
+            for result, write_result in zip(book_results, upsert_books_bulk(books)):
+                result.update(write_result)
+        except Exception as e:
+            logger.error(f"Error in bulk chunk: {e}")
+            for result, book in zip(book_results, books):
+                result.update({"ISBN": book["ISBN"], "status": "error", "error": str(e)})
+    return results
+
+
+# POST /books/bulk
+@books_bp.route('/books/bulk', methods=['POST'])
+def bulk_add_books():
+    """
+    Accepts an NDJSON body with one add_book_by_isbn payload per line.
+
+    Rows are read from the request stream and processed in chunks of
+    ``chunk_size`` (NLP in one batch, one bulk_write per chunk). The response
+    is NDJSON as well: one line per chunk with per-row results, then a summary.
+    Only the fields a row carries are written to an existing book.
+    """
+    chunk_size = max(1, min(request.args.get('chunk_size', BULK_CHUNK_SIZE, type=int), MAX_BULK_CHUNK_SIZE))
+    stream = request.stream
+
+    def generate():
+        totals = {"processed": 0, "upserted": 0, "updated": 0, "failed": 0}
+        chunk = []
+        chunk_number = 0
+        line_number = 0
+
+        def flush():
+            nonlocal chunk, chunk_number
+            results = _process_bulk_chunk(chunk)
+            chunk = []
+            chunk_number += 1
+            for result in results:
+                totals["processed"] += 1
+                totals["failed" if result["status"] == "error" else result["status"]] += 1
+            return json.dumps({"chunk": chunk_number, "results": results, **totals}) + "\n"
+
+        for raw in stream:
+            line_number += 1
+            if not raw.strip():
+                continue
+            chunk.append((line_number, raw))
+            if len(chunk) >= chunk_size:
+                yield flush()
+        if chunk:
+            yield flush()
+        yield json.dumps({"done": True, **totals}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 # GET /fetch_unreleased_books
 @books_bp.route('/fetch_unreleased_books', methods=['GET'])
 def fetch_unreleased_books():
@@ -127,28 +199,90 @@ def fetch_custom_books():
         logger.error(f"Error in fetch_custom_books: {e}")
         return jsonify({"error": str(e)}), 500
 
+# POST /refresh_stale_books
+@books_bp.route('/refresh_stale_books', methods=['POST'])
+def refresh_stale_books():
+    try:
+        max_age_days = request.args.get('max_age_days', type=int)
+        limit = request.args.get('limit', 500, type=int)
+        result = refresh_stale_books_logic(max_age_days, limit)
+        return jsonify({"message": "Stale books refreshed", "result": result}), 200
+    except Exception as e:
+        logger.error(f"Error in refresh_stale_books: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# POST /books/snapshot
+@books_bp.route('/books/snapshot', methods=['POST'])
+def create_snapshot():
+    try:
+        pointer = build_snapshot()
+        return jsonify({"message": "Snapshot built", "snapshot": pointer}), 200
+    except Exception as e:
+        logger.error(f"Error in create_snapshot: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# GET /books/snapshot?since=<version>
+@books_bp.route('/books/snapshot', methods=['GET'])
+def get_snapshot():
+    try:
+        latest = latest_snapshot()
+        if not latest:
+            return jsonify({"message": "No snapshot available"}), 404
+        version = latest["version"]
+        since = request.args.get('since', type=int)
+        # A client that is already current gets an empty delta; 304 is only
+        # sent for a matching If-None-Match, by make_conditional below.
+        name = build_delta(since) if since is not None else None
+        etag = etag_for(version, since) if name else etag_for(version)
+        name = name or f"catalog-v{version}.json.gz"
+        with open(snapshot_path(name), "rb") as f:
+            body = f.read()
+        # Artifacts are stored gzip-compressed and served as-is when the client accepts gzip.
+        if "gzip" in request.accept_encodings:
+            response = Response(body, mimetype="application/json")
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = Response(gzip.decompress(body), mimetype="application/json")
+            etag = f"{etag}-identity"
+        response.vary.add("Accept-Encoding")
+        response.headers["X-Catalog-Version"] = str(version)
+        response.set_etag(etag)
+        return response.make_conditional(request)
+    except Exception as e:
+        logger.error(f"Error in get_snapshot: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# GET /quota_stats
+@books_bp.route('/quota_stats', methods=['GET'])
+def quota_stats():
+    try:
+        return jsonify(quota_report()), 200
+    except Exception as e:
+        logger.error(f"Error in quota_stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
 # GET /books
 @books_bp.route('/books', methods=['GET'])
+@cached_response
 def get_books():
     try:
         books_coll = get_books_collection()
-        books = list(books_coll.find())
-        for book in books:
-            book["_id"] = str(book["_id"])
-        return jsonify(books), 200
+        # cached_response keeps the whole body, so encode it here where cursor
+        # errors are still caught; the encoded bytes are all that is held.
+        return documents_response(books_coll.find(), stream=False)
     except Exception as e:
         logger.error(f"Error in get_books: {e}")
         return jsonify({"error": str(e)}), 500
 
 # GET /books/<book_id>
 @books_bp.route('/books/<book_id>', methods=['GET'])
+@cached_response
 def get_book(book_id):
     try:
         books_coll = get_books_collection()
         book = books_coll.find_one({"_id": ObjectId(book_id)})
         if book:
-            book["_id"] = str(book["_id"])
-            return jsonify(book), 200
+            return document_response(book)
         else:
             return jsonify({"message": "Book not found"}), 404
     except Exception as e:
@@ -159,8 +293,10 @@ def get_book(book_id):
 @books_bp.route('/books/<book_id>', methods=['DELETE'])
 def delete_book(book_id):
     try:
+        book = get_books_collection().find_one({"_id": book_id}, {"ISBN": 1})
         result = delete_book_by_id(book_id)
         if result:
+            unindex_book((book or {}).get("ISBN"))
             return jsonify({"message": "Book deleted successfully!"}), 200
         else:
             return jsonify({"message": "Book not found"}), 404
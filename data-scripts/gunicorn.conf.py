@@ -0,0 +1,34 @@
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get("BOOKKEEPS_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("BOOKKEEPS_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("BOOKKEEPS_THREADS", 4))
+worker_class = "gthread"
+# Import timeouts cover crawls that page through Google Books with pauses.
+timeout = int(os.environ.get("BOOKKEEPS_TIMEOUT", 600))
+pidfile = os.environ.get("BOOKKEEPS_PIDFILE", "gunicorn.pid")
+
+# Load create_app() and the NLP models in the master so workers share them.
+preload_app = True
+# Recycle workers now and then to bound memory growth from long-running imports.
+max_requests = int(os.environ.get("BOOKKEEPS_MAX_REQUESTS", 5000))
+max_requests_jitter = 500
+
+
+def when_ready(server):
+    # Move everything allocated during preload into the permanent generation so
+    # the cyclic GC in the workers doesn't touch (and un-share) those pages.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # MongoClient is re-created by the at-fork hook in modules.db_utils.
+    # Keep torch from spawning one intra-op thread per core in every worker.
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(int(os.environ.get("BOOKKEEPS_TORCH_THREADS", 1)))
@@ -1,7 +1,13 @@
-from .amazon_api import search_book_by_isbn, extract_data_from_item
-from .google_api import fetch_books, get_popular_books_from_google_books
+from .amazon_api import search_book_by_isbn, get_items_by_asins, extract_data_from_item
+from .google_api import fetch_books, get_popular_books_from_google_books, iter_volumes, iter_volume_pages, to_volume_record, VolumeRecord
 from .kg_api import fetch_author_data_from_kg
-from .db_utils import get_books_collection, get_authors_collection, delete_book_by_id, update_book
-from .nlp_utils import extract_attributes, extract_keywords_with_tfidf, enhanced_genre_inference, assign_attributes_to_book_and_author
-from .book_operations import parse_date, normalize_name, filter_book_data, fetch_unreleased_books_logic, fetch_custom_books_logic, delete_old_books_logic
-from .author_operations import extract_authors_from_books, infer_genres_from_biography, assign_attributes_to_author, update_author_in_database, add_popular_authors_logic
\ No newline at end of file
+from .db_utils import get_books_collection, get_authors_collection, delete_book_by_id, update_book, bump_catalog_version, get_catalog_version
+from .nlp_utils import extract_attributes, extract_keywords_with_tfidf, enhanced_genre_inference, assign_attributes_to_book_and_author, extract_attributes_batch, assign_attributes_to_books
+from .book_operations import parse_date, normalize_name, filter_book_data, fetch_unreleased_books_logic, fetch_custom_books_logic, delete_old_books_logic, refresh_stale_books_logic, build_book_from_payload, payload_update, upsert_books_bulk
+from .author_operations import extract_authors_from_books, infer_genres_from_biography, assign_attributes_to_author, assign_attributes_to_authors, update_author_in_database, add_popular_authors_logic
+from .snapshot import build_snapshot, build_delta, latest_snapshot
+from .author_index import author_index, AuthorIndex
+from .dedup import EditionIndex, get_edition_index, check_duplicate_edition, index_book, unindex_book, save_edition_index
+from .quota import acquire, record_result, report, UpstreamThrottled
+from .eventbrite_utils import fetch_eventbrite_events, normalize_event, sync_organization_events
+from .nlp_pool import extract_attributes_many
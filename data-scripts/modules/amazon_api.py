@@ -1,10 +1,11 @@
 import logging
 from paapi5_python_sdk.api.default_api import DefaultApi
-from paapi5_python_sdk.models import SearchItemsRequest
+from paapi5_python_sdk.models import SearchItemsRequest, GetItemsRequest
 from paapi5_python_sdk.rest import ApiException
 from paapi5_python_sdk import ApiClient
 from datetime import datetime
 from config import Config
+from modules import request_log, quota
 
 logger = logging.getLogger(__name__)
 
@@ -14,8 +15,24 @@ AMAZON_PARTNER_TAG = Config.AMAZON_PARTNER_TAG
 AMAZON_HOST = Config.AMAZON_HOST
 AMAZON_REGION = Config.AMAZON_REGION
 
+# GetItems accepts at most 10 item ids per request.
+GET_ITEMS_BATCH_SIZE = 10
+
+ITEM_RESOURCES = [
+    "ItemInfo.Title",
+    "ItemInfo.ByLineInfo",
+    "ItemInfo.ContentInfo",
+    "ItemInfo.ProductInfo",
+    "Images.Primary.Large",
+    "BrowseNodeInfo.BrowseNodes",
+    "Offers.Listings.Price",
+]
+
 def search_book_by_isbn(isbn):
     """Use Amazon’s PA-API to search for a book by ISBN."""
+    return request_log.call("amazon", {"isbn": isbn}, lambda: _search_items_by_isbn(isbn))
+
+def _search_items_by_isbn(isbn):
     api_client = ApiClient(
         AMAZON_ACCESS_KEY,
         AMAZON_SECRET_KEY,
@@ -28,34 +45,82 @@ def search_book_by_isbn(isbn):
         partner_type="Associates",
         keywords=isbn,
         search_index="Books",
-        resources=[
-            "ItemInfo.Title",
-            "ItemInfo.ByLineInfo",
-            "ItemInfo.ContentInfo",
-            "ItemInfo.ProductInfo",
-            "Images.Primary.Large",
-            "BrowseNodeInfo.BrowseNodes",
-            "Offers.Listings.Price",
-        ],
+        resources=ITEM_RESOURCES,
         marketplace="www.amazon.com",
         item_page=1
     )
-    try:
-        response = api_instance.search_items(request)
-        if response.search_result and response.search_result.items:
-            item_dict = response.search_result.items[0].to_dict()
-            return item_dict
-        else:
-            logger.info("No items found for ISBN: %s", isbn)
-            return None
-    except ApiException as e:
-        logger.error("PA-API Error: %s", str(e))
+    response = _call_pa_api(api_instance.search_items, request)
+    if response is None:
+        return None
+    if response.search_result and response.search_result.items:
+        item_dict = response.search_result.items[0].to_dict()
+        return item_dict
+    else:
+        logger.info("No items found for ISBN: %s", isbn)
         return None
 
+def get_items_by_asins(asins):
+    """Look up to GET_ITEMS_BATCH_SIZE items by ASIN in one PA-API call.
+
+    Returns a dict mapping ASIN to item dict; ASINs Amazon did not return are absent.
+    """
+    asins = list(asins)[:GET_ITEMS_BATCH_SIZE]
+    if not asins:
+        return {}
+    return request_log.call("amazon", {"asins": asins}, lambda: _get_items(asins), default={})
+
+def _get_items(asins):
+    api_client = ApiClient(
+        AMAZON_ACCESS_KEY,
+        AMAZON_SECRET_KEY,
+        AMAZON_HOST,
+        AMAZON_REGION
+    )
+    api_instance = DefaultApi(api_client=api_client)
+    request = GetItemsRequest(
+        partner_tag=AMAZON_PARTNER_TAG,
+        partner_type="Associates",
+        item_ids=asins,
+        resources=ITEM_RESOURCES,
+        marketplace="www.amazon.com",
+    )
+    response = _call_pa_api(api_instance.get_items, request)
+    if response is None:
+        return {}
+    if response.items_result and response.items_result.items:
+        return {item.asin: item.to_dict() for item in response.items_result.items}
+    logger.info("No items found for ASINs: %s", asins)
+    return {}
+
+def _call_pa_api(operation, request):
+    """Run a PA-API operation under the shared quota, retrying throttled calls.
+
+    Returns None for other API errors. Raises quota.UpstreamThrottled if PA-API
+    is still throttling after the retries, rather than silently dropping the book.
+    """
+    for attempt in range(quota.MAX_THROTTLE_RETRIES + 1):
+        quota.acquire("amazon")
+        try:
+            response = operation(request)
+        except ApiException as e:
+            quota.record_result("amazon", e.status)
+            if e.status in quota.THROTTLE_STATUSES:
+                logger.warning("PA-API throttled (%s), attempt %d", e.status, attempt + 1)
+                continue
+            logger.error("PA-API Error: %s", str(e))
+            return None
+        quota.record_result("amazon", 200)
+        return response
+    raise quota.UpstreamThrottled("PA-API kept throttling requests")
+
 def extract_data_from_item(item):
     """Extract relevant data (affiliate link, keywords, cover image, etc.) from an Amazon item."""
     updated_data = {}
 
+    asin = item.get('asin')
+    if asin:
+        updated_data['amazonASIN'] = asin
+
     detail_page_url = item.get('detail_page_url')
     if detail_page_url:
         updated_data['amazonAffiliateLink'] = detail_page_url
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from config import Config
+from modules.db_utils import get_authors_collection
+
+logger = logging.getLogger(__name__)
+
+# Authors updated more recently than this are not re-fetched by add_popular_authors_logic.
+AUTHOR_REFRESH_DAYS = getattr(Config, "AUTHOR_REFRESH_DAYS", 30)
+# How often the index picks up authors written by other processes.
+INDEX_REFRESH_SECONDS = getattr(Config, "AUTHOR_INDEX_REFRESH_SECONDS", 60)
+# Each refresh re-reads this much before the previous one started, so writes
+# stamped before it but committed after its query (or on a host whose clock
+# is behind) are still picked up. Re-applying a document is harmless.
+INDEX_REFRESH_OVERLAP_SECONDS = getattr(Config, "AUTHOR_INDEX_REFRESH_OVERLAP_SECONDS", 60)
+
+PROJECTION = {"name": 1, "aliases": 1, "genresWritten": 1, "themes": 1, "writingStyle": 1, "updatedAt": 1}
+
+
+class AuthorEntry(NamedTuple):
+    genres: tuple
+    themes: tuple
+    styles: tuple
+    updated_at: Optional[datetime]
+
+
+def author_key(name):
+    return " ".join(name.split()).casefold()
+
+
+def _doc_keys(doc):
+    """The author's name plus the names it was looked up under (see ``aliases``)."""
+    return {author_key(name) for name in [doc.get("name")] + list(doc.get("aliases") or ()) if name}
+
+
+def _entry_from_doc(doc):
+    return AuthorEntry(
+        genres=tuple(doc.get("genresWritten") or ()),
+        themes=tuple(doc.get("themes") or ()),
+        styles=tuple(doc.get("writingStyle") or ()),
+        updated_at=doc.get("updatedAt"),
+    )
+
+
+class AuthorIndex:
+    """In-memory map of author name to known genres, themes and styles.
+
+    Loaded from the authors collection on first use, then kept current by
+    update() for writes made in this process and by a periodic incremental
+    query on updatedAt for writes made elsewhere.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._synced_until = None
+        self._last_refresh = 0.0
+
+    def load(self):
+        started = datetime.now()
+        entries = {}
+        for doc in get_authors_collection().find({}, PROJECTION):
+            entry = _entry_from_doc(doc)
+            for key in _doc_keys(doc):
+                entries[key] = entry
+        with self._lock:
+            self._entries = entries
+            self._loaded = True
+            self._synced_until = started
+            self._last_refresh = time.monotonic()
+        logger.info(f"Loaded {len(entries)} authors into the author index")
+
+    def refresh(self):
+        """Pick up authors updated since the last load/refresh."""
+        started = datetime.now()
+        count = 0
+        since = self._synced_until - timedelta(seconds=INDEX_REFRESH_OVERLAP_SECONDS)
+        for doc in get_authors_collection().find({"updatedAt": {"$gte": since}}, PROJECTION):
+            if doc.get("name"):
+                self.update(doc)
+                count += 1
+        self._synced_until = started
+        self._last_refresh = time.monotonic()
+        if count:
+            logger.debug(f"Refreshed {count} authors in the author index")
+
+    def _ensure_current(self):
+        if not self._loaded:
+            self.load()
+        elif time.monotonic() - self._last_refresh > INDEX_REFRESH_SECONDS:
+            self.refresh()
+
+    def update(self, author_doc):
+        """Record an author document that was just written to the database."""
+        if author_doc.get("name"):
+            entry = _entry_from_doc(author_doc)
+            with self._lock:
+                for key in _doc_keys(author_doc):
+                    self._entries[key] = entry
+
+    def get(self, name):
+        self._ensure_current()
+        return self._entries.get(author_key(name))
+
+    def is_fresh(self, name, max_age_days=AUTHOR_REFRESH_DAYS):
+        entry = self.get(name)
+        if entry is None or entry.updated_at is None:
+            return False
+        return entry.updated_at >= datetime.now() - timedelta(days=max_age_days)
+
+
+author_index = AuthorIndex()
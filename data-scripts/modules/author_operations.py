@@ -1,18 +1,20 @@
 import logging
 import re
+from datetime import datetime
 from modules.google_api import get_popular_books_from_google_books
 from modules.kg_api import fetch_author_data_from_kg
 from modules.db_utils import get_authors_collection
-from modules.nlp_utils import extract_attributes
+from modules.nlp_pool import extract_attributes, extract_attributes_many, NLP_BATCH_SIZE
+from modules.author_index import author_index, author_key
 
 logger = logging.getLogger(__name__)
 
 def extract_authors_from_books(books):
-    """Extract a set of unique authors from a list of book entries."""
+    """Extract a set of unique authors from an iterable of VolumeRecords (or raw volumes)."""
     authors = set()
     for book in books:
-        volume_info = book.get('volumeInfo', {})
-        for author in volume_info.get('authors', []):
+        book_authors = book.get('volumeInfo', {}).get('authors', []) if isinstance(book, dict) else book.authors
+        for author in book_authors:
             authors.add(author.strip().title())
     return list(authors)
 
@@ -26,19 +28,34 @@ def infer_genres_from_biography(biography, genre_keywords):
                 break
     return list(set(inferred))
 
+def _apply_author_attributes(author_data, attributes, genre_keywords):
+    extracted_themes, extracted_styles, extracted_tones = attributes
+    author_data["themes"] = extracted_themes
+    author_data["writingStyle"] = extracted_styles
+    author_data["tone"] = extracted_tones
+    author_data["genresWritten"] = infer_genres_from_biography(author_data["biography"], genre_keywords)
+    return author_data
+
 def assign_attributes_to_author(author_data, genre_keywords):
     """Add NLP-derived attributes to the author record."""
     biography = author_data.get("biography", "")
     if not biography:
         logger.warning(f"No biography for {author_data.get('name')}")
         return author_data
-    extracted_themes, extracted_styles, extracted_tones = extract_attributes(biography)
-    inferred_genres = infer_genres_from_biography(biography, genre_keywords)
-    author_data["themes"] = extracted_themes
-    author_data["writingStyle"] = extracted_styles
-    author_data["tone"] = extracted_tones
-    author_data["genresWritten"] = inferred_genres
-    return author_data
+    return _apply_author_attributes(author_data, extract_attributes(biography), genre_keywords)
+
+def assign_attributes_to_authors(authors, genre_keywords):
+    """Batched assign_attributes_to_author; the biographies are spread over the NLP workers."""
+    with_biography = []
+    for author_data in authors:
+        if author_data.get("biography"):
+            with_biography.append(author_data)
+        else:
+            logger.warning(f"No biography for {author_data.get('name')}")
+    results = extract_attributes_many([author_data["biography"] for author_data in with_biography])
+    for author_data, attributes in zip(with_biography, results):
+        _apply_author_attributes(author_data, attributes, genre_keywords)
+    return authors
 
 def update_author_in_database(author_data):
     authors_coll = get_authors_collection()
@@ -55,24 +72,44 @@ def update_author_in_database(author_data):
             "themes": list(set(existing.get("themes", []) + author_data.get("themes", []))),
             "writingStyle": list(set(existing.get("writingStyle", []) + author_data.get("writingStyle", []))),
             "tone": list(set(existing.get("tone", []) + author_data.get("tone", []))),
+            "aliases": list(set(existing.get("aliases", []) + author_data.get("aliases", []))),
+            "updatedAt": datetime.now(),
         }
         authors_coll.update_one({"_id": existing["_id"]}, {"$set": update_fields})
+        author_index.update(dict(update_fields, name=author_name))
     else:
+        author_data["updatedAt"] = datetime.now()
         authors_coll.insert_one(author_data)
+        author_index.update(author_data)
 
 def add_popular_authors_logic():
     """Fetch popular books, extract authors, and update the authors collection."""
     from config import GENRE_KEYWORDS
-    books = get_popular_books_from_google_books(max_results=500)
-    if not books:
+    # Streamed page by page; only the author names are kept.
+    author_names = extract_authors_from_books(get_popular_books_from_google_books(max_results=500))
+    if not author_names:
         logger.warning("No books fetched.")
         return
-    author_names = extract_authors_from_books(books)
-    author_names = list(set(author_names))
+    pending = []
     for author_name in author_names:
+        if author_index.is_fresh(author_name):
+            logger.debug(f"Skipping {author_name}: updated recently")
+            continue
         author_data = fetch_author_data_from_kg(author_name)
         if not author_data:
             logger.warning(f"Could not fetch data for {author_name}")
             continue
-        author_data = assign_attributes_to_author(author_data, GENRE_KEYWORDS)
+        if author_key(author_data["name"]) != author_key(author_name):
+            # Knowledge Graph may return a different form of the name; keep ours
+            # so is_fresh recognises it next time.
+            author_data = dict(author_data, aliases=[author_name])
+        pending.append(author_data)
+        if len(pending) >= NLP_BATCH_SIZE:
+            _save_authors(pending, GENRE_KEYWORDS)
+            pending = []
+    if pending:
+        _save_authors(pending, GENRE_KEYWORDS)
+
+def _save_authors(authors, genre_keywords):
+    for author_data in assign_attributes_to_authors(authors, genre_keywords):
         update_author_in_database(author_data)
@@ -1,20 +1,55 @@
 import re
 import logging
-import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 logger = logging.getLogger(__name__)
 
-from modules.google_api import fetch_books
-from modules.amazon_api import search_book_by_isbn, extract_data_from_item
-from modules.nlp_utils import enhanced_genre_inference, assign_attributes_to_book_and_author
-from modules.db_utils import get_books_collection
+from modules.google_api import iter_volume_pages, to_volume_record, PAGE_SIZE
+from modules.amazon_api import search_book_by_isbn, get_items_by_asins, extract_data_from_item, GET_ITEMS_BATCH_SIZE
+from modules.nlp_utils import enhanced_genre_inference, assign_attributes_to_book_and_author, assign_attributes_to_books
+from modules.db_utils import get_books_collection, get_crawl_state_collection, bump_catalog_version
+from modules.dedup import check_duplicate_edition, index_book, unindex_book, save_edition_index
+from modules.quota import report as quota_report, UpstreamThrottled
 
 from config import Config
 
 MAX_TITLE_LENGTH = 45
 
 GENRE_KEYWORDS = Config.GENRE_KEYWORDS
+# How far ahead of today the unreleased-books crawl looks when choosing query years.
+CRAWL_HORIZON_DAYS = getattr(Config, "CRAWL_HORIZON_DAYS", 90)
+# Number of most recent volume ids remembered per query.
+MAX_WATERMARK_IDS = 200
+# Books whose lastEnrichedAt is older than this are picked up by the refresh job.
+REFRESH_MAX_AGE_DAYS = getattr(Config, "REFRESH_MAX_AGE_DAYS", 7)
+# Fields the refresh job compares against PA-API; only changed ones are written.
+# PA-API has no description, so the NLP attributes are never refreshed.
+REFRESHABLE_FIELDS = (
+    "amazonASIN",
+    "amazonAffiliateLink",
+    "coverImage",
+    "pagecount",
+    "publishedDate",
+    "publisher",
+    "keywords",
+)
+# Optional fields of an add-by-ISBN payload, with the values a new book gets
+# when the payload leaves them out.
+PAYLOAD_DEFAULTS = {
+    "title": None,
+    "authors": [],
+    "publisher": None,
+    "publishedDate": None,
+    "pagecount": None,
+    "coverImage": None,
+    "amazonAffiliateLink": None,
+    "subtitle": None,
+    "genres": [],
+    "mainGenre": None,
+    "favoriteCount": 0,
+}
 
 def parse_date(date_str):
     if isinstance(date_str, datetime):
@@ -34,33 +69,73 @@ def parse_date(date_str):
 def normalize_name(name):
     return ' '.join(part.capitalize() for part in name.strip().split())
 
-def filter_book_data(book):
-    volume_info = book.get('volumeInfo', {})
-    if not volume_info:
+def target_years(today=None):
+    """Years covered by the window from today to CRAWL_HORIZON_DAYS ahead."""
+    today = today or datetime.now().date()
+    horizon = today + timedelta(days=CRAWL_HORIZON_DAYS)
+    return list(range(today.year, horizon.year + 1))
+
+def load_crawl_watermark(query):
+    """Return the stored watermark for a crawl query, or an empty dict."""
+    return get_crawl_state_collection().find_one({"query": query}) or {}
+
+def save_crawl_watermark(query, watermark, new_ids, newest_published, depth, retry_ids=()):
+    """Merge the volume ids settled in this run into the query's watermark.
+
+    ``retry_ids`` are volumes skipped for reasons that may change (no PA-API
+    listing or affiliate link yet, incomplete metadata); they stay out of
+    seenIds so the next run looks at them again.
+    """
+    retry_ids = [volume_id for volume_id in dict.fromkeys(retry_ids) if volume_id]
+    retry_set = set(retry_ids)
+    settled_ids = [volume_id for volume_id in new_ids if volume_id not in retry_set]
+    seen_ids = list(dict.fromkeys(settled_ids + watermark.get("seenIds", [])))[:MAX_WATERMARK_IDS]
+    previous_newest = watermark.get("newestPublishedDate")
+    if previous_newest and (not newest_published or previous_newest > newest_published):
+        newest_published = previous_newest
+    get_crawl_state_collection().update_one(
+        {"query": query},
+        {"$set": {
+            "seenIds": seen_ids,
+            "retryIds": retry_ids[:MAX_WATERMARK_IDS],
+            "newestPublishedDate": newest_published,
+            "lastDepth": depth,
+            "updatedAt": datetime.now(),
+        }},
+        upsert=True
+    )
+
+def filter_book_data(book, assign_attributes=True):
+    """Validate a volume (VolumeRecord or raw API payload), infer genres and run NLP.
+
+    The crawls pass ``assign_attributes=False`` and run the NLP for a page's
+    accepted books in one batch (see _store_crawled_books).
+    """
+    if isinstance(book, dict):
+        book = to_volume_record(book)
+    if not book:
         logger.info("Rejected: missing volumeInfo")
         return None
-    title = volume_info.get('title')
+    title = book.title
     if not title or len(title) > MAX_TITLE_LENGTH:
         logger.info("Rejected: missing title or title too long")
         return None
-    authors = volume_info.get('authors', [])
+    authors = book.authors
     if not authors or any(author == "To Be Announced" for author in authors):
         logger.info("Rejected: invalid authors")
         return None
     authors = [normalize_name(author) for author in authors]
-    if not volume_info.get('publishedDate'):
+    if not book.published_date:
         logger.info("Rejected: missing published date")
         return None
-    description = volume_info.get('description', '')
-    if not volume_info.get('categories') and not description:
+    description = book.description
+    if not book.categories and not description:
         logger.info("Rejected: missing category and description")
         return None
-    image_links = volume_info.get('imageLinks', {})
-    if not image_links or not image_links.get('thumbnail'):
+    if not book.thumbnail:
         logger.info("Rejected: missing image")
         return None
-    published_date_str = volume_info.get('publishedDate')
-    published_date = parse_date(published_date_str)
+    published_date = parse_date(book.published_date)
     if not published_date:
         logger.info("Rejected: invalid published date")
         return None
@@ -72,38 +147,61 @@ def filter_book_data(book):
         description = description[0].upper() + description[1:]
     genres = enhanced_genre_inference(
         description,
-        volume_info.get('categories', []),
+        list(book.categories),
         title,
-        volume_info.get('subtitle'),
+        book.subtitle,
         authors
     )
-    cover_image_url = image_links.get('thumbnail', '')
+    cover_image_url = book.thumbnail
     if cover_image_url.startswith('http:'):
         cover_image_url = cover_image_url.replace('http:', 'https:')
     filtered_book = {
         "title": title,
-        "subtitle": volume_info.get('subtitle'),
+        "subtitle": book.subtitle,
         "authors": authors,
-        "publisher": volume_info.get('publisher'),
+        "publisher": book.publisher,
         "publishedDate": published_date,
-        "ISBN": None,
-        "pagecount": volume_info.get('pageCount'),
+        "ISBN": book.isbn13,
+        "pagecount": book.page_count,
         "genres": genres,
         "mainGenre": genres[0] if genres else "Unknown",
         "description": description,
         "coverImage": cover_image_url
     }
     logger.info(filtered_book)
-    assign_attributes_to_book_and_author(filtered_book)
-    for identifier in volume_info.get('industryIdentifiers', []):
-        if identifier['type'] == 'ISBN_13':
-            filtered_book['ISBN'] = identifier['identifier']
-            break
+    if assign_attributes:
+        assign_attributes_to_book_and_author(filtered_book)
     return filtered_book
 
+def _store_crawled_books(books_coll, books):
+    """Run the NLP for a page's accepted books in one batch, then upsert them by ISBN.
+
+    Returns the {title, isbn, authors} summaries of the books written.
+    """
+    if not books:
+        return []
+    # One call spreads the page's descriptions over the NLP workers.
+    assign_attributes_to_books(books)
+    inserted = []
+    for filtered_book in books:
+        isbn = filtered_book["ISBN"]
+        existing = books_coll.find_one({"ISBN": isbn}, {"favoriteCount": 1})
+        filtered_book["favoriteCount"] = existing.get("favoriteCount", 0) if existing else 0
+        filtered_book["lastEnrichedAt"] = datetime.now()
+        update_result = books_coll.update_one({"ISBN": isbn}, {"$set": filtered_book}, upsert=True)
+        index_book(filtered_book)
+        logger.info(
+            f"Inserted/updated book: {filtered_book['title']} (matched: {update_result.matched_count}, upserted: {update_result.upserted_id})")
+        inserted.append({
+            "title": filtered_book["title"],
+            "isbn": isbn,
+            "authors": filtered_book.get("authors")
+        })
+    bump_catalog_version()
+    return inserted
+
 def fetch_unreleased_books_logic(genre):
     total_books_fetched = 0
-    max_attempts = 5
     today = datetime.now().date()
     max_index = 40
     inserted_books = []
@@ -111,152 +209,295 @@ def fetch_unreleased_books_logic(genre):
 
     keyword_list = GENRE_KEYWORDS.get(genre, [])
     logger.info(f"Processing genre: {genre}")
-    for keyword in keyword_list:
-        keyword_with_year = f"{keyword} 2025"
-        start_index = 0
-        attempt = 0
-        while start_index < max_index:
-            if attempt >= max_attempts:
-                break
-            result = fetch_books(keyword_with_year, start_index)
-            books = result.get('items', []) if result else []
-            if not books:
-                break
-            for book in books:
-                volume_info = book.get('volumeInfo', {})
-                logger.debug(f"Processing book with volume_info: {volume_info}")
-                if volume_info.get('language') != 'en':
-                    logger.debug("Skipping non-English book")
-                    continue
-
-                published_date_str = volume_info.get('publishedDate')
-                pub_date = parse_date(published_date_str)
-                if isinstance(pub_date, datetime):
-                    pub_date = pub_date.date()
-                if pub_date is None or pub_date < today:
-                    logger.debug(f"Skipping book with old published date: {published_date_str}")
-                    continue
-
-                filtered_book = filter_book_data(book)
-                if not filtered_book:
-                    logger.debug("Book was rejected during filtering")
-                    continue
-
-                isbn = filtered_book.get("ISBN")
-                title = filtered_book.get("title")
-                logger.info(f"Book accepted for further processing: {title} (ISBN: {isbn})")
-
-                if books_coll.find_one({"title": title, "authors": filtered_book.get("authors", [])}):
-                    logger.debug("Book already exists in DB by title and authors")
-                    continue
-                if books_coll.find_one({"ISBN": isbn}):
-                    logger.debug("Book already exists in DB by ISBN")
-                    continue
-
-                logger.debug("Calling Amazon API for additional data")
-                amazon_item = search_book_by_isbn(isbn)
-                if not amazon_item:
-                    logger.debug("No data returned from Amazon API")
-                    continue
-
-                amazon_data = extract_data_from_item(amazon_item)
-                filtered_book.update(amazon_data)
-                if not amazon_data.get("amazonAffiliateLink"):
-                    logger.debug("Amazon data rejected due to missing affiliate link")
-                    continue
-
-                if books_coll.find_one({"ISBN": isbn}):
-                    filtered_book["favoriteCount"] = books_coll.find_one({"ISBN": isbn}).get("favoriteCount", 0)
-                else:
-                    filtered_book["favoriteCount"] = 0
-
-                update_result = books_coll.update_one({"ISBN": isbn}, {"$set": filtered_book}, upsert=True)
-                logger.info(
-                    f"Inserted/updated book: {title} (matched: {update_result.matched_count}, upserted: {update_result.upserted_id})")
-                inserted_books.append({
-                    "title": title,
-                    "isbn": isbn,
-                    "authors": filtered_book.get("authors")
-                })
-                total_books_fetched += 1
-            start_index += 40
-            attempt += 1
-            time.sleep(3)
+    queries = [f"{keyword} {year}" for keyword in keyword_list for year in target_years(today)]
+    try:
+        for keyword_with_year in queries:
+            # Results are ordered newest first, so once a page reaches volumes seen
+            # by a previous run there is nothing new further down.
+            watermark = load_crawl_watermark(keyword_with_year)
+            seen_ids = set(watermark.get("seenIds", []))
+            # Skipped last time for a reason that may have changed; keep paging
+            # past the watermark until all of them have come up again.
+            pending_retry_ids = set(watermark.get("retryIds", []))
+            new_ids = []
+            retry_ids = []
+            newest_published = None
+            reached_watermark = False
+            depth = 0
+            for page in iter_volume_pages(keyword_with_year, max_results=max_index):
+                accepted = []
+                try:
+                    for book in page:
+                        if book.volume_id in seen_ids:
+                            reached_watermark = True
+                            continue
+                        if book.volume_id:
+                            new_ids.append(book.volume_id)
+                            pending_retry_ids.discard(book.volume_id)
+                        logger.debug(f"Processing book: {book}")
+                        if book.language != 'en':
+                            logger.debug("Skipping non-English book")
+                            continue
+
+                        pub_date = parse_date(book.published_date)
+                        if pub_date and (newest_published is None or pub_date > newest_published):
+                            newest_published = pub_date
+                        if isinstance(pub_date, datetime):
+                            pub_date = pub_date.date()
+                        if pub_date is None or pub_date < today:
+                            logger.debug(f"Skipping book with old published date: {book.published_date}")
+                            continue
+
+                        if check_duplicate_edition(book.title, book.authors, book.description, book.isbn13):
+                            logger.debug("Skipping edition of a book already in the catalog")
+                            continue
+
+                        # Upcoming volumes often lack a description or cover at first.
+                        filtered_book = filter_book_data(book, assign_attributes=False)
+                        if not filtered_book:
+                            logger.debug("Book was rejected during filtering")
+                            retry_ids.append(book.volume_id)
+                            continue
+
+                        isbn = filtered_book.get("ISBN")
+                        title = filtered_book.get("title")
+                        logger.info(f"Book accepted for further processing: {title} (ISBN: {isbn})")
+
+                        if books_coll.find_one({"title": title, "authors": filtered_book.get("authors", [])}):
+                            logger.debug("Book already exists in DB by title and authors")
+                            continue
+                        if books_coll.find_one({"ISBN": isbn}) or any(b["ISBN"] == isbn for b in accepted):
+                            logger.debug("Book already exists in DB by ISBN")
+                            continue
+
+                        logger.debug("Calling Amazon API for additional data")
+                        amazon_item = search_book_by_isbn(isbn)
+                        if not amazon_item:
+                            logger.debug("No data returned from Amazon API")
+                            retry_ids.append(book.volume_id)
+                            continue
+
+                        amazon_data = extract_data_from_item(amazon_item)
+                        filtered_book.update(amazon_data)
+                        if not amazon_data.get("amazonAffiliateLink"):
+                            logger.debug("Amazon data rejected due to missing affiliate link")
+                            retry_ids.append(book.volume_id)
+                            continue
+
+                        accepted.append(filtered_book)
+                finally:
+                    # Written even when a throttled upstream cuts the page short.
+                    stored = _store_crawled_books(books_coll, accepted)
+                    inserted_books.extend(stored)
+                    total_books_fetched += len(stored)
+                depth += PAGE_SIZE
+                if reached_watermark and not pending_retry_ids:
+                    logger.info(f"Reached watermark for '{keyword_with_year}' at index {depth}")
+                    break
+            save_crawl_watermark(keyword_with_year, watermark, new_ids, newest_published, depth, retry_ids)
+    except UpstreamThrottled as e:
+        # The breaker is open: keep what was inserted and stop. The interrupted
+        # query's watermark is not saved, so the next run repeats it.
+        logger.warning(f"Stopping the crawl for '{genre}': {e}")
+    finally:
+        save_edition_index()
+        logger.info(f"Upstream quota usage: {quota_report()}")
     return inserted_books, total_books_fetched
 
 def fetch_custom_books_logic(custom_query):
     total_books_fetched = 0
     max_books = 200
-    start_index = 0
-    batch_size = 40
     today = datetime.now().date()
     inserted_books = []
     books_coll = get_books_collection()
-    while total_books_fetched < max_books:
-        result = fetch_books(custom_query, start_index, batch_size)
-        if not result or 'items' not in result:
-            break
-        books = result.get('items', [])
-        if not books:
-            break
-        for book in books:
-            volume_info = book.get('volumeInfo', {})
-            if not volume_info:
-                continue
-            title = volume_info.get('title')
-            if not title:
-                continue
-            authors = volume_info.get('authors', [])
-            if not authors:
-                continue
-            published_date_str = volume_info.get('publishedDate')
-            if not published_date_str:
-                continue
-            if volume_info.get('language') != 'en':
-                continue
-            pub_date = parse_date(published_date_str)
-            if isinstance(pub_date, datetime):
-                pub_date = pub_date.date()
-            if pub_date is None or pub_date < today:
-                continue
-            if not volume_info.get('imageLinks', {}).get('thumbnail'):
-                continue
-            filtered_book = filter_book_data(book)
-            if not filtered_book:
-                continue
-            isbn = filtered_book.get("ISBN")
-            title = filtered_book.get("title")
-            authors_list = filtered_book.get("authors")
-            if not isbn:
-                continue
-            if books_coll.find_one({"title": title, "authors": authors_list}):
-                continue
-            if books_coll.find_one({"ISBN": isbn}):
-                continue
-            amazon_item = search_book_by_isbn(isbn)
-            if not amazon_item:
-                continue
-            amazon_data = extract_data_from_item(amazon_item)
-            filtered_book.update(amazon_data)
-            if not filtered_book.get("amazonAffiliateLink"):
-                continue
-            if books_coll.find_one({"ISBN": isbn}):
-                filtered_book["favoriteCount"] = books_coll.find_one({"ISBN": isbn}).get("favoriteCount", 0)
-            else:
-                filtered_book["favoriteCount"] = 0
-            books_coll.update_one({"ISBN": isbn}, {"$set": filtered_book}, upsert=True)
-            inserted_books.append({
-                "title": filtered_book["title"],
-                "isbn": isbn,
-                "authors": filtered_book["authors"]
-            })
-            total_books_fetched += 1
-        start_index += batch_size
-        if total_books_fetched >= max_books:
-            break
-        time.sleep(3)
+    try:
+        for page in iter_volume_pages(custom_query):
+            accepted = []
+            try:
+                for book in page:
+                    if not book.title:
+                        continue
+                    if not book.authors:
+                        continue
+                    if not book.published_date:
+                        continue
+                    if book.language != 'en':
+                        continue
+                    pub_date = parse_date(book.published_date)
+                    if isinstance(pub_date, datetime):
+                        pub_date = pub_date.date()
+                    if pub_date is None or pub_date < today:
+                        continue
+                    if not book.thumbnail:
+                        continue
+                    if check_duplicate_edition(book.title, book.authors, book.description, book.isbn13):
+                        continue
+                    filtered_book = filter_book_data(book, assign_attributes=False)
+                    if not filtered_book:
+                        continue
+                    isbn = filtered_book.get("ISBN")
+                    title = filtered_book.get("title")
+                    authors_list = filtered_book.get("authors")
+                    if not isbn:
+                        continue
+                    if books_coll.find_one({"title": title, "authors": authors_list}):
+                        continue
+                    if books_coll.find_one({"ISBN": isbn}) or any(b["ISBN"] == isbn for b in accepted):
+                        continue
+                    amazon_item = search_book_by_isbn(isbn)
+                    if not amazon_item:
+                        continue
+                    amazon_data = extract_data_from_item(amazon_item)
+                    filtered_book.update(amazon_data)
+                    if not filtered_book.get("amazonAffiliateLink"):
+                        continue
+                    accepted.append(filtered_book)
+            finally:
+                stored = _store_crawled_books(books_coll, accepted)
+                inserted_books.extend(stored)
+                total_books_fetched += len(stored)
+            if total_books_fetched >= max_books:
+                break
+    except UpstreamThrottled as e:
+        # The breaker is open: keep what was inserted and stop.
+        logger.warning(f"Stopping the crawl for '{custom_query}': {e}")
+    finally:
+        save_edition_index()
+        logger.info(f"Upstream quota usage: {quota_report()}")
     return inserted_books, total_books_fetched
 
+def build_book_from_payload(data):
+    """Build a book record from an add-by-ISBN payload.
+
+    Returns (book_data, None) or (None, error message) when a required field is missing.
+    """
+    if not isinstance(data, dict):
+        return None, "Payload must be a JSON object."
+    isbn = data.get('isbn')
+    description = data.get('description')
+    if not isbn:
+        return None, "ISBN is required."
+    if not description:
+        return None, "Description is required."
+    book_data = {"ISBN": isbn, "description": description}
+    # Only the fields the payload carries, so re-sending a partial record
+    # leaves the rest of a stored book alone.
+    book_data.update({field: data[field] for field in PAYLOAD_DEFAULTS if field in data})
+    book_data["lastEnrichedAt"] = datetime.now()
+    return book_data, None
+
+def payload_update(book_data):
+    """Upsert update for a build_book_from_payload record.
+
+    Missing fields only get their defaults when the book is inserted, so an
+    update never blanks stored values or resets favoriteCount.
+    """
+    update = {"$set": book_data}
+    defaults = {field: value for field, value in PAYLOAD_DEFAULTS.items() if field not in book_data}
+    if defaults:
+        update["$setOnInsert"] = defaults
+    return update
+
+def upsert_books_bulk(books):
+    """Assign NLP attributes to a batch of books and upsert them by ISBN in one bulk_write.
+
+    Returns one result dict per book, in order.
+    """
+    assign_attributes_to_books(books)
+    operations = [UpdateOne({"ISBN": book["ISBN"]}, payload_update(book), upsert=True) for book in books]
+    results = [{"ISBN": book["ISBN"], "status": "updated"} for book in books]
+    try:
+        bulk_result = get_books_collection().bulk_write(operations, ordered=False)
+        upserted_ids = bulk_result.upserted_ids
+    except BulkWriteError as e:
+        upserted_ids = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+        for error in e.details.get("writeErrors", []):
+            results[error["index"]].update({"status": "error", "error": error.get("errmsg")})
+    for index, upserted_id in upserted_ids.items():
+        results[index].update({"status": "upserted", "upserted_id": str(upserted_id)})
+    bump_catalog_version()
+    # Index what is stored, since partial rows don't carry every field.
+    written = [book["ISBN"] for book, result in zip(books, results) if result["status"] != "error"]
+    for stored in get_books_collection().find({"ISBN": {"$in": written}}, {"ISBN": 1, "title": 1, "authors": 1, "description": 1}):
+        index_book(stored)
+    return results
+
+def _comparable(value):
+    """Normalize a field value so stored and freshly fetched values compare equal."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Mongo hands back naive UTC datetimes.
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, list):
+        return sorted(value, key=str)
+    return value
+
+def diff_book_fields(existing, fresh):
+    """Return the refreshable fields whose fresh value differs from the stored one."""
+    changes = {}
+    for field in REFRESHABLE_FIELDS:
+        if field in fresh and _comparable(fresh[field]) != _comparable(existing.get(field)):
+            changes[field] = fresh[field]
+    return changes
+
+def refresh_stale_books_logic(max_age_days=None, limit=500):
+    """Re-query PA-API for books not enriched recently and write only what changed.
+
+    Books that already have an ASIN are looked up with batched GetItems calls;
+    the rest fall back to a search by ISBN. Every checked book gets
+    lastRefreshAttemptAt, so books PA-API can't find wait out the same
+    max age instead of taking the whole limit on every run.
+    """
+    max_age_days = REFRESH_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    cutoff = datetime.now() - timedelta(days=max_age_days)
+    books_coll = get_books_collection()
+    projection = {field: 1 for field in REFRESHABLE_FIELDS + ("ISBN",)}
+    stale_books = books_coll.find(
+        {"$and": [
+            {"$or": [{"lastEnrichedAt": {"$lt": cutoff}}, {"lastEnrichedAt": {"$exists": False}}]},
+            {"$or": [{"lastRefreshAttemptAt": {"$lt": cutoff}}, {"lastRefreshAttemptAt": {"$exists": False}}]},
+        ]},
+        projection
+    ).sort("lastEnrichedAt", 1).limit(limit)
+
+    stats = {"checked": 0, "updated": 0, "unchanged": 0, "notFound": 0}
+    batch = []
+    for book in stale_books:
+        batch.append(book)
+        if len(batch) == GET_ITEMS_BATCH_SIZE:
+            _refresh_batch(books_coll, batch, stats)
+            batch = []
+    if batch:
+        _refresh_batch(books_coll, batch, stats)
+    logger.info(f"Refresh finished: {stats}")
+    return stats
+
+def _refresh_batch(books_coll, books, stats):
+    items_by_asin = get_items_by_asins([book["amazonASIN"] for book in books if book.get("amazonASIN")])
+    now = datetime.now()
+    operations = []
+    for book in books:
+        stats["checked"] += 1
+        item = items_by_asin.get(book.get("amazonASIN"))
+        if not item and book.get("ISBN"):
+            item = search_book_by_isbn(book["ISBN"])
+        if not item:
+            stats["notFound"] += 1
+            operations.append(UpdateOne({"_id": book["_id"]}, {"$set": {"lastRefreshAttemptAt": now}}))
+            continue
+
+        changes = diff_book_fields(book, extract_data_from_item(item))
+        if changes:
+            stats["updated"] += 1
+            logger.info(f"Refreshing {book.get('ISBN')}: {sorted(changes)}")
+        else:
+            stats["unchanged"] += 1
+        changes["lastEnrichedAt"] = now
+        changes["lastRefreshAttemptAt"] = now
+        operations.append(UpdateOne({"_id": book["_id"]}, {"$set": changes}))
+    if operations:
+        books_coll.bulk_write(operations, ordered=False)
+        bump_catalog_version()
+
 def delete_old_books_logic():
     from datetime import timedelta
     one_month_ago = datetime.now() - timedelta(days=30)
@@ -265,5 +506,9 @@ def delete_old_books_logic():
     for book in books_coll.find({"publishedDate": {"$lt": one_month_ago}}):
         book_id = book["_id"]
         books_coll.delete_one({"_id": book_id})
+        unindex_book(book.get("ISBN"))
         deleted_books_count += 1
+    if deleted_books_count:
+        bump_catalog_version()
+        save_edition_index()
     return {"deleted_books_count": deleted_books_count}
@@ -1,16 +1,36 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
 from pymongo.server_api import ServerApi
 import logging
+import os
+import threading
+import time
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 MONGO_URI = Config.MONGO_URI
 DATABASE_NAME = Config.DATABASE_NAME
+# The catalog version counter lives in Mongo so writes from any host invalidate
+# every host's caches; readers re-check it at most this often.
+CATALOG_VERSION_TTL_SECONDS = getattr(Config, "CATALOG_VERSION_TTL_SECONDS", 1.0)
+CATALOG_VERSION_ID = "catalog"
 
 client = MongoClient(MONGO_URI, server_api=ServerApi('1'))
 db = client[DATABASE_NAME]
 
+def reset_client():
+    """Give this process its own MongoClient.
+
+    MongoClient is not fork-safe; a preforking server imports this module in
+    the master, so each worker must reconnect after the fork.
+    """
+    global client, db
+    client = MongoClient(MONGO_URI, server_api=ServerApi('1'))
+    db = client[DATABASE_NAME]
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_client)
+
 def get_books_collection():
     return db["Books"]
 
@@ -20,12 +40,52 @@ def get_authors_collection():
 def delete_book_by_id(book_id):
     books_coll = get_books_collection()
     result = books_coll.delete_one({"_id": book_id})
+    if result.deleted_count:
+        bump_catalog_version()
     return result.deleted_count > 0
 
 def update_book(book_data, query):
     books_coll = get_books_collection()
     result = books_coll.update_one(query, {"$set": book_data}, upsert=True)
+    bump_catalog_version()
     return result
 
 def get_events_collection():
-    return db["events"]
\ No newline at end of file
+    return db["events"]
+
+def get_crawl_state_collection():
+    return db["crawl_state"]
+
+def get_catalog_state_collection():
+    return db["catalog_state"]
+
+_version_lock = threading.Lock()
+_cached_version = None
+_cached_version_at = 0.0
+
+def _remember_version(doc):
+    global _cached_version, _cached_version_at
+    state = ((doc or {}).get("version", 0), (doc or {}).get("updatedAt"))
+    with _version_lock:
+        # Concurrent readers may finish out of order; never go backwards.
+        if _cached_version is None or state[0] >= _cached_version[0]:
+            _cached_version = state
+        _cached_version_at = time.monotonic()
+    return state
+
+def bump_catalog_version():
+    """Increment the catalog version; every write to the Books collection must call this."""
+    doc = get_catalog_state_collection().find_one_and_update(
+        {"_id": CATALOG_VERSION_ID},
+        {"$inc": {"version": 1}, "$currentDate": {"updatedAt": True}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return _remember_version(doc)[0]
+
+def get_catalog_version():
+    """Return (version, last_modified), re-reading Mongo at most every CATALOG_VERSION_TTL_SECONDS."""
+    with _version_lock:
+        if _cached_version is not None and time.monotonic() - _cached_version_at < CATALOG_VERSION_TTL_SECONDS:
+            return _cached_version
+    return _remember_version(get_catalog_state_collection().find_one({"_id": CATALOG_VERSION_ID}))
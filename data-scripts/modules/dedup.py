@@ -0,0 +1,345 @@
+import hashlib
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+from collections import defaultdict
+
+from config import Config
+from modules.db_utils import get_books_collection, bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+# Warm-start cache only; the index is reconciled with the catalog on load and
+# every DEDUP_INDEX_REFRESH_SECONDS, so concurrent writers can't lose books.
+DEDUP_INDEX_PATH = getattr(Config, "DEDUP_INDEX_PATH", "dedup_index.pickle")
+DEDUP_INDEX_REFRESH_SECONDS = getattr(Config, "DEDUP_INDEX_REFRESH_SECONDS", 600)
+# "merge" records the edition's ISBN on the existing book, "flag" only logs and
+# skips it, "off" disables the check. Matches on title and authors alone (one
+# side has no description) are only logged, never merged or skipped.
+DEDUP_MODE = getattr(Config, "DEDUP_MODE", "merge")
+# Estimated Jaccard similarity above which two volumes count as the same work.
+DEDUP_THRESHOLD = getattr(Config, "DEDUP_THRESHOLD", 0.5)
+# Stricter threshold for matches on title and authors alone (logged only).
+DEDUP_TITLE_THRESHOLD = getattr(Config, "DEDUP_TITLE_THRESHOLD", 0.8)
+# 32 bands of 4 rows: pairs with similarity around 0.42 or more become candidates.
+NUM_PERM = 128
+NUM_BANDS = 32
+DESCRIPTION_SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Edition and format markers that differ between editions of the same work.
+EDITION_PATTERN = re.compile(
+    r"\b(deluxe|special|collector'?s|limited|anniversary|illustrated|annotated|expanded|"
+    r"hardcover|hardback|paperback|mass market|ebook|e-book|kindle|large print|"
+    r"unabridged|abridged|edition|signed|exclusive|a novel)\b"
+)
+# "[Deluxe Edition]" style suffixes are dropped; "(Book 2)" style ones are kept.
+BRACKETED_PATTERN = re.compile(r"[\(\[][^\)\]]*[\)\]]")
+NON_WORD_PATTERN = re.compile(r"[^a-z0-9\s]")
+TITLE_STOPWORDS = {"the", "a", "an", "and", "of"}
+NUMBER_WORDS = {"one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+                "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10"}
+SERIES_NUMBER_PATTERN = re.compile(
+    r"(?:\b(?:book|volume|vol|part|no)\.?\s*|#)(\d+|" + "|".join(NUMBER_WORDS) + r")\b"
+)
+
+# Fixed seeds so signatures are comparable across runs and processes.
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME or 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME)
+    for i in range(NUM_PERM)
+]
+
+
+def _title_words(text):
+    text = NON_WORD_PATTERN.sub(" ", text.replace("'", ""))
+    return [word for word in EDITION_PATTERN.sub(" ", text).split() if word not in TITLE_STOPWORDS]
+
+
+def normalize_title(title):
+    """Title and subtitle words without edition/format markers.
+
+    Subtitles and series numbers are kept: "Thrawn" and "Thrawn: Alliances",
+    or "(Book 1)" and "(Book 2)", are different books.
+    """
+    title = BRACKETED_PATTERN.sub(lambda m: m.group() if _title_words(m.group()) else " ", (title or "").lower())
+    return " ".join(_title_words(title))
+
+
+def series_numbers(title):
+    """Volume numbers named in a title ("Book 2", "#3", "Volume Two")."""
+    return {NUMBER_WORDS.get(n, n).lstrip("0") for n in SERIES_NUMBER_PATTERN.findall((title or "").lower())}
+
+
+def normalize_author(author):
+    """First initial and surname, so "P. Ashby" and "Peter Ashby" match."""
+    parts = NON_WORD_PATTERN.sub(" ", (author or "").lower()).split()
+    if len(parts) < 2:
+        return " ".join(parts)
+    return f"{parts[0][0]} {parts[-1]}"
+
+
+def shingles(title, authors, description):
+    """Token set combining normalized title words, authors and description word n-grams."""
+    tokens = {f"t:{word}" for word in normalize_title(title).split()}
+    tokens.update(f"a:{normalize_author(author)}" for author in authors or [] if author)
+    words = NON_WORD_PATTERN.sub(" ", (description or "").lower()).split()
+    for i in range(len(words) - DESCRIPTION_SHINGLE_SIZE + 1):
+        tokens.add("d:" + " ".join(words[i:i + DESCRIPTION_SHINGLE_SIZE]))
+    return tokens
+
+
+def minhash(tokens):
+    hashes = [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), "big") for t in tokens]
+    if not hashes:
+        return None
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _bands(signature):
+    rows = NUM_PERM // NUM_BANDS
+    return [hash(signature[i * rows:(i + 1) * rows]) for i in range(NUM_BANDS)]
+
+
+def fingerprint(title, authors, description):
+    """Digest of the fields a signature is built from, to spot changed catalog rows."""
+    raw = "\x1f".join([title or "", "\x1e".join(authors or []), description or ""])
+    return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+
+class EditionIndex:
+    """MinHash/LSH index over the catalog used to catch other editions of a book.
+
+    Each book gets two signatures: one over title, author and description
+    shingles, and a title/author-only one used when either side has no
+    description. Both are banded into their own LSH buckets.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, title_threshold=DEDUP_TITLE_THRESHOLD):
+        self.threshold = threshold
+        self.title_threshold = title_threshold
+        self.entries = {}
+        self.buckets = [defaultdict(set) for _ in range(NUM_BANDS)]
+        self.title_buckets = [defaultdict(set) for _ in range(NUM_BANDS)]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry(title, authors, description):
+        title_signature = minhash(shingles(title, authors, None))
+        if title_signature is None:
+            return None
+        return {
+            "signature": minhash(shingles(title, authors, description)) if description else title_signature,
+            "title_signature": title_signature,
+            "has_description": bool(description),
+            "authors": {normalize_author(a) for a in authors or []},
+            "numbers": series_numbers(title),
+            "fingerprint": fingerprint(title, authors, description),
+        }
+
+    def _index(self, key, entry):
+        self.entries[key] = entry
+        for band, bucket in zip(_bands(entry["signature"]), self.buckets):
+            bucket[band].add(key)
+        for band, bucket in zip(_bands(entry["title_signature"]), self.title_buckets):
+            bucket[band].add(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        for band, bucket in zip(_bands(entry["signature"]), self.buckets):
+            bucket[band].discard(key)
+        for band, bucket in zip(_bands(entry["title_signature"]), self.title_buckets):
+            bucket[band].discard(key)
+
+    def add(self, key, title, authors, description):
+        entry = self._entry(title, authors, description)
+        if entry is None:
+            return
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+            self._index(key, entry)
+
+    def find_duplicate(self, title, authors, description):
+        """Return (key, similarity, title_only) of the closest indexed edition above the threshold, or None.
+
+        ``title_only`` is True when either side had no description and only
+        the title and authors were compared.
+        """
+        query = self._entry(title, authors, description)
+        if query is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for band, bucket in zip(_bands(query["signature"]), self.buckets):
+                candidates.update(bucket.get(band, ()))
+            for band, bucket in zip(_bands(query["title_signature"]), self.title_buckets):
+                candidates.update(bucket.get(band, ()))
+            best = None
+            for key in candidates:
+                entry = self.entries[key]
+                # Different people writing similarly titled books are not editions.
+                if query["authors"] and entry["authors"] and not query["authors"] & entry["authors"]:
+                    continue
+                # Different volumes of a series.
+                if query["numbers"] and entry.get("numbers") and query["numbers"] != entry["numbers"]:
+                    continue
+                title_only = not (query["has_description"] and entry["has_description"])
+                if title_only:
+                    similarity = estimated_similarity(query["title_signature"], entry["title_signature"])
+                    threshold = self.title_threshold
+                else:
+                    similarity = estimated_similarity(query["signature"], entry["signature"])
+                    threshold = self.threshold
+                # A match on the description outranks any title-only one.
+                if similarity >= threshold and (best is None or (not title_only, similarity) > (not best[2], best[1])):
+                    best = (key, similarity, title_only)
+        return best
+
+    def discard(self, key):
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def sync_with_catalog(self):
+        """Reconcile with the Books collection: index new or changed books, drop deleted ones.
+
+        Only rows whose fingerprint changed are re-hashed, so this is one
+        projection scan rather than a rebuild.
+        """
+        projection = {"ISBN": 1, "title": 1, "authors": 1, "description": 1}
+        current = set()
+        changed = 0
+        for book in get_books_collection().find({"ISBN": {"$ne": None}}, projection):
+            key = book["ISBN"]
+            current.add(key)
+            entry = self.entries.get(key)
+            if entry is None or entry.get("fingerprint") != fingerprint(
+                    book.get("title"), book.get("authors"), book.get("description")):
+                self.add(key, book.get("title"), book.get("authors"), book.get("description"))
+                changed += 1
+        with self._lock:
+            removed = [key for key in self.entries if key not in current]
+            for key in removed:
+                self._remove(key)
+        if changed or removed:
+            logger.info(f"Edition index synced: {changed} added/changed, {len(removed)} removed, {len(self)} total")
+
+    def save(self, path=DEDUP_INDEX_PATH):
+        with self._lock:
+            state = {"entries": dict(self.entries)}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEDUP_INDEX_PATH):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index = cls()
+        for key, entry in state["entries"].items():
+            index._index(key, entry)
+        return index
+
+    @classmethod
+    def build_from_catalog(cls):
+        index = cls()
+        index.sync_with_catalog()
+        logger.info(f"Built edition index with {len(index)} books")
+        return index
+
+
+_edition_index = None
+_last_sync = 0.0
+_sync_lock = threading.Lock()
+
+
+def get_edition_index():
+    """Return the process's index, synced with the catalog at most every DEDUP_INDEX_REFRESH_SECONDS.
+
+    The pickle only speeds up the first load; other processes' writes and
+    deletes are picked up by the sync.
+    """
+    global _edition_index, _last_sync
+    with _sync_lock:
+        if _edition_index is None:
+            if os.path.exists(DEDUP_INDEX_PATH):
+                _edition_index = EditionIndex.load()
+                _edition_index.sync_with_catalog()
+            else:
+                _edition_index = EditionIndex.build_from_catalog()
+            _edition_index.save()
+            _last_sync = time.monotonic()
+        elif time.monotonic() - _last_sync > DEDUP_INDEX_REFRESH_SECONDS:
+            _edition_index.sync_with_catalog()
+            _last_sync = time.monotonic()
+    return _edition_index
+
+
+def index_book(book):
+    """Add or update a book that was just written to the catalog.
+
+    An index this process hasn't loaded yet is left alone: it picks the book
+    up when it syncs on load.
+    """
+    if DEDUP_MODE != "off" and _edition_index is not None and book.get("ISBN"):
+        get_edition_index().add(book["ISBN"], book.get("title"), book.get("authors"), book.get("description"))
+
+
+def unindex_book(isbn):
+    """Drop a book that was just deleted from the catalog."""
+    if DEDUP_MODE != "off" and _edition_index is not None and isbn:
+        get_edition_index().discard(isbn)
+
+
+def save_edition_index():
+    """Write this process's index to DEDUP_INDEX_PATH, if dedup is on and it was loaded."""
+    if DEDUP_MODE != "off" and _edition_index is not None:
+        _edition_index.save()
+
+
+def check_duplicate_edition(title, authors, description, isbn):
+    """Check a volume against the catalog before it is enriched.
+
+    Returns the ISBN of the catalog book it duplicates, or None. In "merge"
+    mode the volume's ISBN is added to that book's alternateISBNs. Matches on
+    title and authors alone are only logged: without descriptions, sequels
+    and companion books look the same as editions.
+    """
+    if DEDUP_MODE == "off":
+        return None
+    match = get_edition_index().find_duplicate(title, authors, description)
+    if not match:
+        return None
+    existing_isbn, similarity, title_only = match
+    if isbn == existing_isbn:
+        return existing_isbn
+    if title_only:
+        logger.info(f"Possible edition (title only, not merged): '{title}' ({isbn}) ~ {existing_isbn} ({similarity:.2f})")
+        return None
+    logger.info(f"Near-duplicate edition: '{title}' ({isbn}) ~ {existing_isbn} ({similarity:.2f})")
+    if DEDUP_MODE == "merge" and isbn:
+        result = get_books_collection().update_one({"ISBN": existing_isbn}, {"$addToSet": {"alternateISBNs": isbn}})
+        if not result.matched_count:
+            # The book was deleted since it was indexed.
+            get_edition_index().discard(existing_isbn)
+            return None
+        if result.modified_count:
+            bump_catalog_version()
+    return existing_isbn
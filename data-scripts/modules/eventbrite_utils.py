@@ -0,0 +1,184 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import Config
+from modules import request_log
+from modules.db_utils import get_events_collection, get_crawl_state_collection
+
+logger = logging.getLogger(__name__)
+
+# Point this at scripts/eventbrite_fixture_server.py to import without touching the real API.
+EVENTBRITE_API_URL = getattr(Config, "EVENTBRITE_API_URL", "https://www.eventbriteapi.com/v3").rstrip("/")
+EVENTBRITE_TOKEN = getattr(Config, "EVENTBRITE_TOKEN", None)
+EVENTBRITE_ORGANIZATION_IDS = getattr(Config, "EVENTBRITE_ORGANIZATION_IDS", [])
+# Pages after the first are fetched in parallel; the quota manager still paces the requests.
+EVENTBRITE_PAGE_CONCURRENCY = getattr(Config, "EVENTBRITE_PAGE_CONCURRENCY", 4)
+# "all" so events that end or are canceled still come back with their new
+# status; a "live" listing just stops returning them and the stored copy goes stale.
+EVENTBRITE_STATUS = getattr(Config, "EVENTBRITE_STATUS", "all")
+
+SOURCE = "eventbrite"
+
+_index_ready = False
+
+
+def ensure_event_indexes():
+    """Unique index backing the (source, externalId) upsert key."""
+    global _index_ready
+    if not _index_ready:
+        get_events_collection().create_index([("source", 1), ("externalId", 1)], unique=True)
+        _index_ready = True
+
+
+def fetch_event_page(organization_id, page):
+    """Fetch one page of an organization's events; None on failure."""
+    url = f"{EVENTBRITE_API_URL}/organizations/{organization_id}/events/"
+    params = {"status": EVENTBRITE_STATUS, "expand": "venue", "page": page}
+    headers = {"Authorization": f"Bearer {EVENTBRITE_TOKEN}"} if EVENTBRITE_TOKEN else None
+    try:
+        response = request_log.get(SOURCE, url, params=params, headers=headers)
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.HTTPError as http_err:
+        logger.error(f"HTTP error fetching Eventbrite page {page} for {organization_id}: {http_err}")
+    except requests.exceptions.RequestException as req_err:
+        logger.error(f"Request error fetching Eventbrite page {page} for {organization_id}: {req_err}")
+    return None
+
+
+def iter_organization_event_pages(organization_id):
+    """Yield an organization's event pages, fetching pages 2..N concurrently.
+
+    The first page tells us the page count; the rest are requested in parallel
+    and yielded in page order. Failed pages are yielded as None.
+    """
+    first = fetch_event_page(organization_id, 1)
+    yield first
+    if not first:
+        return
+    page_count = (first.get("pagination") or {}).get("page_count") or 1
+    if page_count < 2:
+        return
+    with ThreadPoolExecutor(max_workers=EVENTBRITE_PAGE_CONCURRENCY) as executor:
+        yield from executor.map(lambda page: fetch_event_page(organization_id, page), range(2, page_count + 1))
+
+
+def _parse_utc(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+    except ValueError:
+        logger.debug(f"Unparseable Eventbrite timestamp: {value}")
+        return None
+
+
+def _text(field):
+    return (field or {}).get("text") or ""
+
+
+def normalize_event(event):
+    """Project a raw Eventbrite event onto the events collection schema."""
+    venue = event.get("venue") or {}
+    address = venue.get("address") or {}
+    start = event.get("start") or {}
+    return {
+        "source": SOURCE,
+        "externalId": event.get("id"),
+        "organizationId": event.get("organization_id"),
+        "name": _text(event.get("name")),
+        "description": _text(event.get("description")) or event.get("summary") or "",
+        "url": event.get("url"),
+        "status": event.get("status"),
+        "start": _parse_utc(start.get("utc")),
+        "end": _parse_utc((event.get("end") or {}).get("utc")),
+        "timezone": start.get("timezone"),
+        "isOnline": bool(event.get("online_event")),
+        "isFree": bool(event.get("is_free")),
+        "venue": {
+            "name": venue.get("name"),
+            "address": address.get("localized_address_display"),
+            "city": address.get("city"),
+            "region": address.get("region"),
+            "country": address.get("country"),
+        } if venue else None,
+        "imageUrl": (event.get("logo") or {}).get("url"),
+        "externalChangedAt": _parse_utc(event.get("changed")),
+    }
+
+
+def _sync_key(organization_id):
+    return f"{SOURCE}:{organization_id}"
+
+
+def sync_organization_events(organization_id):
+    """Upsert the organization's events changed since the last sync.
+
+    Returns the normalized events that were written.
+    """
+    state = get_crawl_state_collection().find_one({"query": _sync_key(organization_id)}) or {}
+    changed_since = state.get("changedSince")
+    newest_changed = changed_since
+    imported = []
+    operations = []
+    seen = 0
+    now = datetime.now()
+    complete = True
+    for page in iter_organization_event_pages(organization_id):
+        if page is None:
+            complete = False
+            continue
+        for event in page.get("events", []):
+            seen += 1
+            doc = normalize_event(event)
+            if not doc["externalId"]:
+                continue
+            changed = doc["externalChangedAt"]
+            # Timestamps have one-second resolution, so the watermark's own second
+            # is re-read; events without a change timestamp are always re-written.
+            if changed and changed_since and changed < changed_since:
+                continue
+            if changed and (newest_changed is None or changed > newest_changed):
+                newest_changed = changed
+            doc["updatedAt"] = now
+            operations.append(UpdateOne(
+                {"source": SOURCE, "externalId": doc["externalId"]},
+                {"$set": doc, "$setOnInsert": {"createdAt": now}},
+                upsert=True
+            ))
+            imported.append(doc)
+
+    if operations:
+        try:
+            result = get_events_collection().bulk_write(operations, ordered=False)
+            logger.info(f"Eventbrite {organization_id}: {result.upserted_count} new, "
+                        f"{result.modified_count} updated of {seen} listed")
+        except BulkWriteError as bwe:
+            logger.error(f"Bulk write error importing Eventbrite events for {organization_id}: {bwe.details}")
+            raise
+    else:
+        logger.info(f"Eventbrite {organization_id}: no changes since {changed_since} ({seen} listed)")
+
+    # A missing page may hold changes older than newest_changed, so only a
+    # complete listing moves the watermark.
+    if complete and seen:
+        get_crawl_state_collection().update_one(
+            {"query": _sync_key(organization_id)},
+            {"$set": {"changedSince": newest_changed, "lastSeen": seen, "updatedAt": now}},
+            upsert=True
+        )
+    return imported
+
+
+def fetch_eventbrite_events(organization_ids=None):
+    """Import events for the configured Eventbrite organizations; returns the events written."""
+    ensure_event_indexes()
+    imported = []
+    for organization_id in organization_ids or EVENTBRITE_ORGANIZATION_IDS:
+        imported.extend(sync_organization_events(organization_id))
+    return imported
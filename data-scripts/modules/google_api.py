@@ -1,11 +1,54 @@
 import requests
 import logging
+from typing import NamedTuple, Optional
 from config import Config
+from modules import request_log
 
 logger = logging.getLogger(__name__)
 
 GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
 GOOGLE_BOOKS_API_KEY = Config.GOOGLE_BOOKS_API_KEY
+PAGE_SIZE = 40  # the API's maximum maxResults
+
+class VolumeRecord(NamedTuple):
+    """The fields of a Google Books volume the crawlers and author import use."""
+    volume_id: Optional[str]
+    title: Optional[str]
+    subtitle: Optional[str]
+    authors: tuple
+    publisher: Optional[str]
+    published_date: Optional[str]
+    description: str
+    categories: tuple
+    page_count: Optional[int]
+    language: Optional[str]
+    thumbnail: Optional[str]
+    isbn13: Optional[str]
+
+def to_volume_record(item):
+    """Project a raw volume payload onto a VolumeRecord; None if it has no volumeInfo."""
+    volume_info = item.get('volumeInfo')
+    if not volume_info:
+        return None
+    isbn13 = None
+    for identifier in volume_info.get('industryIdentifiers', []):
+        if identifier.get('type') == 'ISBN_13':
+            isbn13 = identifier.get('identifier')
+            break
+    return VolumeRecord(
+        volume_id=item.get('id'),
+        title=volume_info.get('title'),
+        subtitle=volume_info.get('subtitle'),
+        authors=tuple(volume_info.get('authors', ())),
+        publisher=volume_info.get('publisher'),
+        published_date=volume_info.get('publishedDate'),
+        description=volume_info.get('description', ''),
+        categories=tuple(volume_info.get('categories', ())),
+        page_count=volume_info.get('pageCount'),
+        language=volume_info.get('language'),
+        thumbnail=(volume_info.get('imageLinks') or {}).get('thumbnail'),
+        isbn13=isbn13,
+    )
 
 def fetch_books(query, start_index=0, max_results=40):
     """Fetch books from the Google Books API given a query."""
@@ -18,7 +61,7 @@ def fetch_books(query, start_index=0, max_results=40):
         'key': GOOGLE_BOOKS_API_KEY,
     }
     try:
-        response = requests.get(GOOGLE_BOOKS_API_URL, params=params)
+        response = request_log.get("google_books", GOOGLE_BOOKS_API_URL, params=params)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.HTTPError as http_err:
@@ -27,28 +70,30 @@ def fetch_books(query, start_index=0, max_results=40):
         logger.error(f"Request error: {req_err}")
     return None
 
+def iter_volume_pages(query, max_results=None, page_size=PAGE_SIZE):
+    """Yield one page of VolumeRecords at a time, fetching the next page lazily.
+
+    Stops at the first empty or failed page, or once max_results volumes were requested.
+    """
+    start_index = 0
+    while max_results is None or start_index < max_results:
+        batch_size = page_size if max_results is None else min(page_size, max_results - start_index)
+        result = fetch_books(query, start_index, batch_size)
+        items = result.get('items', []) if result else []
+        if not items:
+            return
+        # Drop the raw payload before the caller starts on the page.
+        records = [record for record in map(to_volume_record, items) if record]
+        del result, items
+        yield records
+        start_index += batch_size
+
+def iter_volumes(query, max_results=None, page_size=PAGE_SIZE):
+    """Yield VolumeRecords for a query one by one, keeping at most one page in memory."""
+    for page in iter_volume_pages(query, max_results, page_size):
+        yield from page
+
 def get_popular_books_from_google_books(max_results=500):
-    """Retrieve popular books (e.g. bestsellers) from the Google Books API."""
-    books = []
-    total_fetched = 0
+    """Stream popular books (e.g. bestsellers) from the Google Books API as VolumeRecords."""
     max_allowed = 500  # Or any other limit you wish to enforce
-    while total_fetched < max_results and total_fetched < max_allowed:
-        params = {
-            'q': 'bestseller',
-            'orderBy': 'newest',
-            'printType': 'books',
-            'startIndex': total_fetched,
-            'maxResults': min(40, max_results - total_fetched),
-            'key': GOOGLE_BOOKS_API_KEY
-        }
-        response = requests.get(GOOGLE_BOOKS_API_URL, params=params)
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch books: {response.status_code}")
-            break
-        data = response.json()
-        items = data.get('items', [])
-        if not items:
-            break
-        books.extend(items)
-        total_fetched += len(items)
-    return books
+    return iter_volumes('bestseller', min(max_results, max_allowed))
@@ -1,6 +1,7 @@
 import requests
 import logging
 from config import Config
+from modules import request_log
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,7 @@ def fetch_author_data_from_kg(author_name):
             'indent': True,
             'types': 'Person'
         }
-        response = requests.get(ENTERPRISE_KNOWLEDGE_GRAPH_API_ENDPOINT, params=params)
+        response = request_log.get("knowledge_graph", ENTERPRISE_KNOWLEDGE_GRAPH_API_ENDPOINT, params=params)
         response.raise_for_status()
         data = response.json()
         if data and "itemListElement" in data and data["itemListElement"]:
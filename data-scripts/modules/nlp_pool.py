@@ -0,0 +1,174 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Worker processes per calling process; 0 runs everything in-process. The
+# pool is per process, so with gunicorn each web worker gets its own.
+NLP_WORKERS = getattr(Config, "NLP_WORKERS", 0)
+# Batches a worker handles before it is replaced, bounding memory growth.
+NLP_MAX_TASKS_PER_WORKER = getattr(Config, "NLP_MAX_TASKS_PER_WORKER", 200)
+# Batches queued or running at once; submitters block beyond this.
+NLP_MAX_PENDING = getattr(Config, "NLP_MAX_PENDING", None)
+NLP_BATCH_SIZE = getattr(Config, "NLP_BATCH_SIZE", 32)
+NLP_TASK_TIMEOUT_SECONDS = getattr(Config, "NLP_TASK_TIMEOUT_SECONDS", 300)
+NLP_TORCH_THREADS = getattr(Config, "NLP_TORCH_THREADS", 1)
+
+_lock = threading.Lock()
+_pool = None
+_pending = None
+_workers = NLP_WORKERS
+
+
+def _init_worker(torch_threads):
+    """Load the models once per worker process."""
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    from modules import nlp_utils  # noqa: F401  (loads spaCy and the sentiment model)
+
+
+def _run_batch(texts):
+    from modules.nlp_utils import extract_attributes_batch
+    return extract_attributes_batch(texts)
+
+
+def _in_process(texts):
+    from modules.nlp_utils import extract_attributes_batch
+    return extract_attributes_batch(texts, batch_size=NLP_BATCH_SIZE)
+
+
+def _create_pool(workers):
+    # Spawned workers don't inherit the parent's threads, locks or MongoClient.
+    context = multiprocessing.get_context("spawn")
+    try:
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(NLP_TORCH_THREADS,), max_tasks_per_child=NLP_MAX_TASKS_PER_WORKER)
+    except TypeError:
+        # max_tasks_per_child needs Python 3.11.
+        logger.warning("NLP worker recycling unavailable on this Python version")
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(NLP_TORCH_THREADS,))
+
+
+def get_pool():
+    """Return the worker pool, creating it on first use; None when disabled."""
+    global _pool, _pending
+    if _workers <= 0:
+        return None
+    with _lock:
+        if _pool is None:
+            try:
+                _pool = _create_pool(_workers)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not start NLP worker pool, running in-process: {e}")
+                return None
+            _pending = threading.BoundedSemaphore(NLP_MAX_PENDING or 2 * _workers)
+            logger.info(f"Started NLP worker pool with {_workers} workers")
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def configure(workers=None):
+    """Resize the pool at runtime (the next call starts the new one)."""
+    global _workers
+    shutdown()
+    if workers is not None:
+        _workers = workers
+
+
+def warm_up():
+    """Start every worker and wait until each has loaded the models."""
+    pool = get_pool()
+    if pool is not None:
+        for future in [pool.submit(_run_batch, []) for _ in range(_workers)]:
+            future.result()
+
+
+def _submit(pool, semaphore, texts):
+    semaphore.acquire()
+    try:
+        future = pool.submit(_run_batch, texts)
+    except BaseException:
+        semaphore.release()
+        raise
+    future.add_done_callback(lambda _: semaphore.release())
+    return future
+
+
+def extract_attributes_many(texts):
+    """(themes, writing styles, tones) for each text, computed on the worker pool.
+
+    Texts are split into batches spread across the workers. Falls back to
+    in-process extraction when the pool is disabled or a batch fails.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    pool = get_pool()
+    if pool is None:
+        return _in_process(texts)
+
+    batch_size = max(1, min(NLP_BATCH_SIZE, -(-len(texts) // _workers)))
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    futures = []
+    try:
+        for batch in batches:
+            futures.append(_submit(pool, _pending, batch))
+    except (BrokenProcessPool, RuntimeError) as e:
+        logger.error(f"NLP worker pool unavailable, running in-process: {e}")
+        _discard_pool(pool)
+
+    results = []
+    for i, batch in enumerate(batches):
+        try:
+            results.extend(futures[i].result(timeout=NLP_TASK_TIMEOUT_SECONDS))
+            continue
+        except IndexError:
+            pass
+        except (BrokenProcessPool, CancelledError) as e:
+            logger.error(f"NLP worker died, restarting the pool: {e!r}")
+            _discard_pool(pool)
+        except FutureTimeoutError:
+            logger.warning(f"NLP batch of {len(batch)} timed out, running it in-process")
+        results.extend(_in_process(batch))
+    return results
+
+
+def extract_attributes(text):
+    """Pool-backed nlp_utils.extract_attributes for a single text."""
+    return extract_attributes_many([text])[0]
+
+
+def _reset_after_fork():
+    # The pool's management thread and pipes belong to the parent.
+    global _pool
+    _pool = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(shutdown)
@@ -7,58 +7,78 @@ from transformers import pipeline
 import nltk
 from nltk.corpus import stopwords
 from config import Config
+from modules.author_index import author_index
+from modules import nlp_pool
 
 logger = logging.getLogger(__name__)
 
 nlp = spacy.load("en_core_web_sm")
 sentiment_analysis = pipeline("sentiment-analysis")
-nltk.download('stopwords')
+# Every NLP worker imports this module, so only go to the network when the
+# corpus isn't installed yet (replay mode and offline hosts never need to).
+try:
+    nltk.data.find('corpora/stopwords')
+except LookupError:
+    nltk.download('stopwords', quiet=True)
 stop_words = set(stopwords.words('english'))
 
 GENRE_KEYWORDS = Config.GENRE_KEYWORDS
 GENRE_ATTRIBUTES = Config.GENRE_ATTRIBUTES
 writing_style_keywords = Config.writing_style_keywords
 theme_keywords = Config.theme_keywords
+# Votes each of an author's known genres adds to enhanced_genre_inference.
+AUTHOR_GENRE_PRIOR_WEIGHT = getattr(Config, "AUTHOR_GENRE_PRIOR_WEIGHT", 1)
 
 
-def extract_attributes(text):
-    """Extract themes, writing styles, and tone from a block of text."""
-    extracted_themes = []
-    extracted_writing_styles = []
-    extracted_tones = []
-    doc = nlp(text.lower())
+_matchers = None
 
-    theme_matcher = PhraseMatcher(nlp.vocab, attr='LOWER')
-    writing_style_matcher = PhraseMatcher(nlp.vocab, attr='LOWER')
 
-    for theme, keywords in theme_keywords.items():
-        patterns = [nlp.make_doc(kw.lower()) for kw in keywords]
-        theme_matcher.add(theme, patterns)
+def _get_matchers():
+    """Build the theme and writing-style matchers once per process."""
+    global _matchers
+    if _matchers is None:
+        theme_matcher = PhraseMatcher(nlp.vocab, attr='LOWER')
+        writing_style_matcher = PhraseMatcher(nlp.vocab, attr='LOWER')
 
-    for style, keywords in writing_style_keywords.items():
-        patterns = [nlp.make_doc(kw.lower()) for kw in keywords]
-        writing_style_matcher.add(style, patterns)
+        for theme, keywords in theme_keywords.items():
+            patterns = [nlp.make_doc(kw.lower()) for kw in keywords]
+            theme_matcher.add(theme, patterns)
 
-    for match_id, start, end in theme_matcher(doc):
-        theme = nlp.vocab.strings[match_id]
-        extracted_themes.append(theme)
+        for style, keywords in writing_style_keywords.items():
+            patterns = [nlp.make_doc(kw.lower()) for kw in keywords]
+            writing_style_matcher.add(style, patterns)
 
-    for match_id, start, end in writing_style_matcher(doc):
-        style = nlp.vocab.strings[match_id]
-        extracted_writing_styles.append(style)
+        _matchers = (theme_matcher, writing_style_matcher)
+    return _matchers
 
-    extracted_themes = list(set(extracted_themes))
-    extracted_writing_styles = list(set(extracted_writing_styles))
 
-    truncated_text = text[:512]
-    sentiment_result = sentiment_analysis(truncated_text)
+def _attributes_from_doc(doc, sentiment_result):
+    theme_matcher, writing_style_matcher = _get_matchers()
+    extracted_themes = list({nlp.vocab.strings[match_id] for match_id, start, end in theme_matcher(doc)})
+    extracted_writing_styles = list({nlp.vocab.strings[match_id] for match_id, start, end in writing_style_matcher(doc)})
+
     tone = "Neutral"
     if sentiment_result:
-        label = sentiment_result[0]['label']
+        label = sentiment_result['label']
         tone = "Positive" if label == "POSITIVE" else "Negative" if label == "NEGATIVE" else "Neutral"
-    extracted_tones.append(tone)
+    return extracted_themes, extracted_writing_styles, [tone]
+
+
+def extract_attributes(text):
+    """Extract themes, writing styles, and tone from a block of text."""
+    doc = nlp(text.lower())
+    truncated_text = text[:512]
+    sentiment_result = sentiment_analysis(truncated_text)
+    return _attributes_from_doc(doc, sentiment_result[0] if sentiment_result else None)
+
 
-    return extracted_themes, extracted_writing_styles, extracted_tones
+def extract_attributes_batch(texts, batch_size=32):
+    """Batched extract_attributes: one nlp.pipe pass and one batched sentiment call."""
+    if not texts:
+        return []
+    docs = nlp.pipe((text.lower() for text in texts), batch_size=batch_size)
+    sentiment_results = sentiment_analysis([text[:512] for text in texts], batch_size=batch_size)
+    return [_attributes_from_doc(doc, result) for doc, result in zip(docs, sentiment_results)]
 
 
 def extract_keywords_with_tfidf(texts, n_keywords=10):
@@ -106,13 +126,27 @@ def enhanced_genre_inference(description, categories, title, subtitle, authors):
                 if re.search(rf'\b{keyword}\b', title, re.IGNORECASE):
                     genre_frequency[genre] += 1
 
-    # (Optionally) Use authors’ known genres if available from the DB.
+    # Use the authors' known genres as a prior (in-memory index, no DB reads).
+    for author in authors or []:
+        entry = author_index.get(author)
+        if entry:
+            for genre in entry.genres:
+                genre_frequency[genre] += AUTHOR_GENRE_PRIOR_WEIGHT
+
     sorted_genres = sorted(genre_frequency, key=genre_frequency.get, reverse=True)
     if "Sports" in sorted_genres and len(sorted_genres) > 1:
         sorted_genres.remove("Sports")
     return sorted_genres if sorted_genres else ["Unknown"]
 
 
+def _apply_book_attributes(book, genre, extracted_themes, extracted_writing_styles, extracted_tones):
+    book["themes"] = list(set(extracted_themes + GENRE_ATTRIBUTES.get(genre, {}).get("themes", [])))
+    book["writingStyle"] = list(
+        set(extracted_writing_styles + GENRE_ATTRIBUTES.get(genre, {}).get("writing_styles", [])))
+    book["tone"] = list(set(extracted_tones + GENRE_ATTRIBUTES.get(genre, {}).get("tones", [])))
+    return book
+
+
 def assign_attributes_to_book_and_author(book):
     """Assign themes, writing styles, and tone to a book (and update the author as needed)."""
     genre = book.get("mainGenre")
@@ -120,9 +154,19 @@ def assign_attributes_to_book_and_author(book):
         logger.warning("No genre found for book.")
         return None
     description = book.get("description", "")
-    extracted_themes, extracted_writing_styles, extracted_tones = extract_attributes(description)
-    book["themes"] = list(set(extracted_themes + GENRE_ATTRIBUTES.get(genre, {}).get("themes", [])))
-    book["writingStyle"] = list(
-        set(extracted_writing_styles + GENRE_ATTRIBUTES.get(genre, {}).get("writing_styles", [])))
-    book["tone"] = list(set(extracted_tones + GENRE_ATTRIBUTES.get(genre, {}).get("tones", [])))
-    return book
+    extracted_themes, extracted_writing_styles, extracted_tones = nlp_pool.extract_attributes(description)
+    return _apply_book_attributes(book, genre, extracted_themes, extracted_writing_styles, extracted_tones)
+
+
+def assign_attributes_to_books(books):
+    """Batched assign_attributes_to_book_and_author for a list of books.
+
+    Books without a mainGenre are left untouched, as in the single-book version.
+    """
+    with_genre = [book for book in books if book.get("mainGenre")]
+    if len(with_genre) < len(books):
+        logger.warning(f"{len(books) - len(with_genre)} book(s) without a genre skipped.")
+    results = nlp_pool.extract_attributes_many([book.get("description", "") for book in with_genre])
+    for book, attributes in zip(with_genre, results):
+        _apply_book_attributes(book, book["mainGenre"], *attributes)
+    return books
@@ -0,0 +1,174 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# SQLite file shared by every process on the host that calls the upstream APIs.
+QUOTA_DB_PATH = getattr(Config, "QUOTA_DB_PATH", "quota.sqlite3")
+
+# upstream -> (requests per second, burst size)
+DEFAULT_LIMITS = {
+    "google_books": (1 / 3, 1),  # the old crawl pace: one page every 3 seconds
+    "knowledge_graph": (5, 5),
+    "amazon": (1, 1),  # PA-API starts at 1 request per second
+    "eventbrite": (0.5, 5),  # 2,000 calls per hour
+}
+UPSTREAM_LIMITS = {**DEFAULT_LIMITS, **getattr(Config, "UPSTREAM_LIMITS", {})}
+
+THROTTLE_STATUSES = {429, 503}
+# Consecutive throttled responses that open an upstream's circuit breaker.
+BREAKER_THRESHOLD = getattr(Config, "BREAKER_THRESHOLD", 3)
+BREAKER_COOLDOWN_SECONDS = getattr(Config, "BREAKER_COOLDOWN_SECONDS", 30)
+BREAKER_MAX_COOLDOWN_SECONDS = 600
+# Bound on the cooldown's doublings (far past the cap) so a long outage can't overflow it.
+BREAKER_MAX_DOUBLINGS = 10
+# Retries for a throttled request before UpstreamThrottled is raised.
+MAX_THROTTLE_RETRIES = getattr(Config, "MAX_THROTTLE_RETRIES", 3)
+# Longest acquire() blocks in a web worker (see configure); scripts wait as long as needed.
+REQUEST_MAX_WAIT_SECONDS = getattr(Config, "QUOTA_REQUEST_MAX_WAIT_SECONDS", 20)
+
+_local = threading.local()
+_max_wait = None
+
+
+class UpstreamThrottled(Exception):
+    """Raised when an upstream keeps throttling after the retries are used up,
+    or when the next request it allows is further away than the caller may wait."""
+
+
+def configure(max_wait):
+    """Cap how long acquire() blocks in this process; None waits indefinitely."""
+    global _max_wait
+    _max_wait = max_wait
+
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(QUOTA_DB_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS buckets (upstream TEXT PRIMARY KEY, tokens REAL, updated_at REAL);
+            CREATE TABLE IF NOT EXISTS breakers (upstream TEXT PRIMARY KEY, failures INTEGER, open_until REAL);
+            CREATE TABLE IF NOT EXISTS stats (
+                upstream TEXT PRIMARY KEY,
+                acquired INTEGER DEFAULT 0,
+                waited_seconds REAL DEFAULT 0,
+                throttled INTEGER DEFAULT 0,
+                breaker_trips INTEGER DEFAULT 0
+            );
+        """)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def _bump_stats(conn, upstream, **increments):
+    conn.execute("INSERT OR IGNORE INTO stats (upstream) VALUES (?)", (upstream,))
+    for column, amount in increments.items():
+        conn.execute(f"UPDATE stats SET {column} = {column} + ? WHERE upstream = ?", (amount, upstream))
+
+
+def _try_take(conn, upstream, now):
+    """Take one token if possible; otherwise return how long to wait."""
+    rate, burst = UPSTREAM_LIMITS.get(upstream, (1, 1))
+    row = conn.execute("SELECT open_until FROM breakers WHERE upstream = ?", (upstream,)).fetchone()
+    if row and row[0] and row[0] > now:
+        return row[0] - now
+
+    row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE upstream = ?", (upstream,)).fetchone()
+    tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+    if tokens >= 1:
+        conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (upstream, tokens - 1, now))
+        return 0
+    conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (upstream, tokens, now))
+    return (1 - tokens) / rate
+
+
+def acquire(upstream, max_wait=None):
+    """Block until a request to ``upstream`` is allowed. Returns the seconds spent waiting.
+
+    Raises UpstreamThrottled instead of waiting past ``max_wait`` (default: the
+    process-wide limit from configure), e.g. while a breaker is open.
+    """
+    if max_wait is None:
+        max_wait = _max_wait
+    conn = _connect()
+    waited = 0.0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            wait = _try_take(conn, upstream, time.time())
+            if wait <= 0:
+                _bump_stats(conn, upstream, acquired=1, waited_seconds=waited)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if wait <= 0:
+            return waited
+        if max_wait is not None and waited + wait > max_wait:
+            raise UpstreamThrottled(f"{upstream} allows the next request in {wait:.0f}s, "
+                                    f"over the {max_wait}s wait limit")
+        time.sleep(wait)
+        waited += wait
+
+
+def record_result(upstream, status):
+    """Feed a response status to the upstream's circuit breaker.
+
+    Throttled responses count towards opening the breaker (again, with a longer
+    cooldown while it keeps failing). An open breaker stays open until its
+    cooldown expires; the first success after that closes it (half-open).
+    Other errors, and successes from requests sent before the breaker opened,
+    leave it as it is.
+    """
+    if status is None:
+        return
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        now = time.time()
+        row = conn.execute("SELECT failures, open_until FROM breakers WHERE upstream = ?", (upstream,)).fetchone()
+        failures, open_until = row if row else (0, None)
+        if status in THROTTLE_STATUSES:
+            failures += 1
+            _bump_stats(conn, upstream, throttled=1)
+            if failures >= BREAKER_THRESHOLD:
+                cooldown = min(BREAKER_MAX_COOLDOWN_SECONDS,
+                               BREAKER_COOLDOWN_SECONDS * 2 ** min(failures - BREAKER_THRESHOLD, BREAKER_MAX_DOUBLINGS))
+                open_until = max(open_until or 0, now + cooldown)
+                _bump_stats(conn, upstream, breaker_trips=1)
+                logger.warning(f"Circuit breaker for {upstream} open for {cooldown:.0f}s after {failures} throttled responses")
+        elif status < 400 and not (open_until and open_until > now):
+            failures, open_until = 0, None
+        conn.execute("INSERT OR REPLACE INTO breakers VALUES (?, ?, ?)", (upstream, failures, open_until))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def report():
+    """Per-upstream quota use, time spent waiting and breaker state, across all processes."""
+    conn = _connect()
+    now = time.time()
+    result = {}
+    for upstream, acquired, waited, throttled, trips in conn.execute(
+            "SELECT upstream, acquired, waited_seconds, throttled, breaker_trips FROM stats"):
+        result[upstream] = {
+            "requests": acquired,
+            "waitedSeconds": round(waited, 1),
+            "throttled": throttled,
+            "breakerTrips": trips,
+        }
+    for upstream, failures, open_until in conn.execute("SELECT upstream, failures, open_until FROM breakers"):
+        entry = result.setdefault(upstream, {})
+        entry["consecutiveThrottled"] = failures
+        entry["breakerOpenSeconds"] = round(open_until - now, 1) if open_until and open_until > now else 0
+    return result
@@ -0,0 +1,212 @@
+import atexit
+import fcntl
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+
+import requests
+from config import Config
+from modules import quota
+
+logger = logging.getLogger(__name__)
+
+# "live" talks to the upstream APIs, "record" talks to them and appends every
+# exchange to the log, "replay" serves the log back without touching the network.
+HTTP_MODE = os.environ.get("BOOKKEEPS_HTTP_MODE", getattr(Config, "HTTP_MODE", "live"))
+HTTP_LOG_PATH = os.environ.get("BOOKKEEPS_HTTP_LOG", getattr(Config, "HTTP_LOG_PATH", "http_log.ndjson.gz"))
+# None for no delay, "recorded" to replay the original timings, or a number of milliseconds.
+REPLAY_LATENCY = os.environ.get("BOOKKEEPS_REPLAY_LATENCY", getattr(Config, "REPLAY_LATENCY", None))
+
+# Query parameters that must never end up in the log or in the lookup key.
+SECRET_PARAMS = {"key"}
+
+_lock = threading.Lock()
+_writer = None
+_writer_pid = None
+_replay_entries = None
+_replay_cursors = defaultdict(int)
+
+
+class ReplayMiss(requests.exceptions.ConnectionError):
+    """Raised in replay mode when the log has no entry for a request."""
+
+
+class ReplayResponse:
+    """Minimal stand-in for requests.Response built from a log entry."""
+
+    def __init__(self, entry):
+        self.status_code = entry.get("status", 200)
+        self.url = entry.get("url")
+        self._body = entry.get("body")
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} (replayed) for url: {self.url}", response=self)
+
+
+def configure(mode=None, path=None, latency=None):
+    """Switch the record/replay mode at runtime (e.g. from create_app or a script)."""
+    global HTTP_MODE, HTTP_LOG_PATH, REPLAY_LATENCY, _replay_entries
+    with _lock:
+        _close_writer()
+        if mode:
+            HTTP_MODE = mode
+        if path:
+            HTTP_LOG_PATH = path
+        if latency is not None:
+            REPLAY_LATENCY = latency
+        _replay_entries = None
+        _replay_cursors.clear()
+    logger.info(f"HTTP mode: {HTTP_MODE} (log: {HTTP_LOG_PATH})")
+
+
+def make_key(upstream, url, params=None):
+    params = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+    return json.dumps([upstream, url, params], sort_keys=True, default=str)
+
+
+def get(upstream, url, params=None, headers=None):
+    """Drop-in for requests.get that honours the record/replay mode and upstream quotas.
+
+    Headers (e.g. auth tokens) are sent but never logged or used in the lookup key.
+    """
+    key = make_key(upstream, url, params)
+    if HTTP_MODE == "replay":
+        entry = _next_replay_entry(key)
+        if entry is None:
+            raise ReplayMiss(f"No recorded response for {upstream} request: {key}")
+        return ReplayResponse(entry)
+
+    for attempt in range(quota.MAX_THROTTLE_RETRIES + 1):
+        quota.acquire(upstream)
+        started = time.perf_counter()
+        response = requests.get(url, params=params, headers=headers)
+        quota.record_result(upstream, response.status_code)
+        if response.status_code not in quota.THROTTLE_STATUSES:
+            break
+        logger.warning(f"{upstream} throttled ({response.status_code}), attempt {attempt + 1}")
+    else:
+        raise quota.UpstreamThrottled(f"{upstream} kept returning {response.status_code}")
+    if HTTP_MODE == "record":
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        _append({
+            "upstream": upstream,
+            "key": key,
+            "url": url,
+            "status": response.status_code,
+            "body": body,
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+        })
+    return response
+
+
+def call(upstream, request, fn, default=None):
+    """Record/replay an SDK call whose result is JSON-serializable.
+
+    ``request`` identifies the call (e.g. ``{"isbn": ...}``); ``fn`` performs it live.
+    On a replay miss ``default`` is returned, as if the upstream had no result.
+    """
+    key = make_key(upstream, "sdk", request)
+    if HTTP_MODE == "replay":
+        entry = _next_replay_entry(key)
+        if entry is None:
+            logger.warning(f"No recorded response for {upstream} call: {key}")
+            return default
+        return entry.get("body")
+
+    started = time.perf_counter()
+    result = fn()
+    if HTTP_MODE == "record":
+        _append({
+            "upstream": upstream,
+            "key": key,
+            "status": 200,
+            "body": json.loads(json.dumps(result, default=str)),
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+        })
+    return result
+
+
+def _append(entry):
+    global _writer, _writer_pid
+    # Every entry is a complete gzip member written under an exclusive lock, so
+    # processes recording to the same log never interleave partial members;
+    # gzip readers treat the concatenation as one stream.
+    member = gzip.compress((json.dumps(entry, default=str) + "\n").encode("utf-8"))
+    with _lock:
+        if _writer is None or _writer_pid != os.getpid():
+            # A handle inherited across fork shares its lock with the parent.
+            _writer = open(HTTP_LOG_PATH, "ab")
+            _writer_pid = os.getpid()
+        fcntl.flock(_writer, fcntl.LOCK_EX)
+        try:
+            _writer.write(member)
+            _writer.flush()
+        finally:
+            fcntl.flock(_writer, fcntl.LOCK_UN)
+
+
+def _close_writer():
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+
+atexit.register(_close_writer)
+
+
+def _load_replay_entries():
+    entries = defaultdict(list)
+    if not os.path.exists(HTTP_LOG_PATH):
+        logger.warning(f"Replay log {HTTP_LOG_PATH} does not exist")
+        return entries
+    with gzip.open(HTTP_LOG_PATH, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["key"]].append(entry)
+        except (EOFError, OSError, zlib.error, json.JSONDecodeError) as e:
+            # A recording process that died mid-write leaves a truncated or damaged
+            # member; everything before it is still served.
+            logger.warning(f"Replay log {HTTP_LOG_PATH} is damaged ({e!r}); using the entries before it")
+    logger.info(f"Loaded {sum(len(v) for v in entries.values())} recorded responses from {HTTP_LOG_PATH}")
+    return entries
+
+
+def _next_replay_entry(key):
+    """Serve recorded responses for a key in order, repeating the last one once exhausted."""
+    global _replay_entries
+    with _lock:
+        if _replay_entries is None:
+            _replay_entries = _load_replay_entries()
+        recorded = _replay_entries.get(key)
+        if not recorded:
+            return None
+        index = min(_replay_cursors[key], len(recorded) - 1)
+        _replay_cursors[key] += 1
+        entry = recorded[index]
+    _simulate_latency(entry)
+    return entry
+
+
+def _simulate_latency(entry):
+    if REPLAY_LATENCY in (None, "", "0"):
+        return
+    if REPLAY_LATENCY == "recorded":
+        delay_ms = entry.get("elapsedMs", 0)
+    else:
+        delay_ms = float(REPLAY_LATENCY)
+    time.sleep(delay_ms / 1000)
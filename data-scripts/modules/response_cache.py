@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response, Response
+from config import Config
+from modules.db_utils import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = getattr(Config, "RESPONSE_CACHE_SIZE", 256)
+# Optional directory shared by all workers on the host; None keeps the cache in-process only.
+RESPONSE_CACHE_DIR = getattr(Config, "RESPONSE_CACHE_DIR", None)
+# Files kept in RESPONSE_CACHE_DIR; beyond this the least recently used are evicted.
+RESPONSE_CACHE_DISK_ENTRIES = getattr(Config, "RESPONSE_CACHE_DISK_ENTRIES", 1024)
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+
+
+def _cache_key():
+    # Accept is part of the key so negotiated representations don't collide.
+    key = f"{request.method} {request.full_path} {request.headers.get('Accept', '')}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _disk_path(key, version):
+    return os.path.join(RESPONSE_CACHE_DIR, f"{key}-v{version}.body")
+
+
+def _disk_version(name):
+    try:
+        return int(name[:-len(".body")].rsplit("-v", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _read_disk(key, version):
+    # The mimetype line followed by the raw body: nothing read from the shared
+    # directory is ever unpickled or executed.
+    path = _disk_path(key, version)
+    try:
+        with open(path, "rb") as f:
+            mimetype = f.readline().decode("utf-8").rstrip("\n")
+            body = f.read()
+        os.utime(path)  # marks the file as recently used
+    except (FileNotFoundError, UnicodeDecodeError):
+        return None
+    return body, mimetype or None
+
+
+def _write_disk(key, version, cached):
+    body, mimetype = cached
+    os.makedirs(RESPONSE_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{key}.", suffix=".tmp", dir=RESPONSE_CACHE_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(f"{mimetype or ''}\n".encode("utf-8"))
+            f.write(body)
+        os.replace(tmp_path, _disk_path(key, version))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _prune_disk(version):
+    """Drop files for older catalog versions, then the least recently used beyond the cap."""
+    current = []
+    for entry in os.scandir(RESPONSE_CACHE_DIR):
+        if not entry.name.endswith(".body"):
+            continue
+        entry_version = _disk_version(entry.name)
+        try:
+            if entry_version is None or entry_version < version:
+                os.remove(entry.path)
+            elif entry_version == version:
+                current.append((entry.stat().st_mtime, entry.path))
+        except FileNotFoundError:
+            pass
+    current.sort()
+    for _, path in current[:max(0, len(current) - RESPONSE_CACHE_DISK_ENTRIES)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _get(key, version):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            if entry[0] == version:
+                _entries.move_to_end(key)
+                return entry[1]
+            del _entries[key]
+    if RESPONSE_CACHE_DIR:
+        cached = _read_disk(key, version)
+        if cached is not None:
+            _put_memory(key, version, cached)
+        return cached
+    return None
+
+
+def _put_memory(key, version, cached):
+    with _lock:
+        _entries[key] = (version, cached)
+        _entries.move_to_end(key)
+        while len(_entries) > RESPONSE_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def _put(key, version, cached):
+    _put_memory(key, version, cached)
+    if RESPONSE_CACHE_DIR:
+        _write_disk(key, version, cached)
+        _prune_disk(version)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def cached_response(view):
+    """Cache a read-only view's 200 responses until the catalog version changes.
+
+    Adds ETag and Last-Modified headers. A matching If-None-Match gets a 304,
+    but only once a 200 for the same URL and catalog version has been
+    produced (cached here or freshly rendered), so errors and 404s are never
+    masked. If-Modified-Since is not honoured: the catalog can change within
+    the one-second resolution of the header.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version, last_modified = get_catalog_version()
+        key = _cache_key()
+        etag = f"v{version}-{key[:16]}"
+
+        cached = _get(key, version)
+        if cached is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            cached = (response.get_data(), response.mimetype)
+            _put(key, version, cached)
+
+        if request.if_none_match and request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(cached[0], mimetype=cached[1])
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    return wrapper
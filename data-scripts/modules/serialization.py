@@ -0,0 +1,111 @@
+import json
+import logging
+from datetime import datetime, date, timezone
+
+from bson import ObjectId, Decimal128
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack responses are optional
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/x-msgpack"
+# Number of documents encoded into each chunk of a streamed array.
+CHUNK_SIZE = 500
+
+
+def _default(obj):
+    """Encode the BSON types orjson/json don't handle natively."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        # Mongo returns naive datetimes in UTC; say so explicitly.
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=timezone.utc)
+        return obj.isoformat()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj):
+    """Serialize to JSON bytes, handling ObjectId and datetime."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NAIVE_UTC)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def _packb(obj):
+    return msgpack.packb(obj, default=_default, datetime=False)
+
+
+def iter_json_array(documents, chunk_size=CHUNK_SIZE):
+    """Yield a JSON array as byte chunks, encoding documents as they come off the cursor."""
+    yield b"["
+    chunk = []
+    first = True
+    for document in documents:
+        chunk.append(dumps(document))
+        if len(chunk) == chunk_size:
+            yield (b"" if first else b",") + b",".join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield (b"" if first else b",") + b",".join(chunk)
+    yield b"]"
+
+
+def iter_msgpack_array(documents, chunk_size=CHUNK_SIZE):
+    """Yield a msgpack stream of documents (one object after another) as byte chunks."""
+    chunk = []
+    for document in documents:
+        chunk.append(_packb(document))
+        if len(chunk) == chunk_size:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+
+
+def wants_msgpack():
+    if msgpack is None:
+        return False
+    accept = request.accept_mimetypes
+    return accept.quality(MSGPACK_MIMETYPE) > accept.quality(JSON_MIMETYPE)
+
+
+def document_response(document, status=200):
+    """Respond with a single document as JSON (or msgpack if the client prefers it)."""
+    if wants_msgpack():
+        return Response(_packb(document), status=status, mimetype=MSGPACK_MIMETYPE)
+    return Response(dumps(document), status=status, mimetype=JSON_MIMETYPE)
+
+
+def documents_response(documents, status=200, stream=True):
+    """Respond with an iterable of documents (e.g. a pymongo cursor).
+
+    JSON clients get an array; msgpack clients get a stream of concatenated
+    objects, readable with msgpack.Unpacker. Documents are encoded chunk by
+    chunk as they come off the cursor. With ``stream=True`` the chunks are
+    streamed to the client; with ``stream=False`` they are joined into one
+    body here, so cursor errors are raised in the caller (and views wrapped
+    in cached_response, which buffers the body anyway, can handle them).
+    """
+    if wants_msgpack():
+        body, mimetype = iter_msgpack_array(documents), MSGPACK_MIMETYPE
+    else:
+        body, mimetype = iter_json_array(documents), JSON_MIMETYPE
+    if not stream:
+        body = b"".join(body)
+    return Response(body, status=status, mimetype=mimetype)
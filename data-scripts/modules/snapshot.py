@@ -0,0 +1,315 @@
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import Config
+from modules.db_utils import get_books_collection
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+SNAPSHOT_DIR = getattr(Config, "SNAPSHOT_DIR", "snapshots")
+# Number of past manifests kept around for delta snapshots.
+SNAPSHOT_RETENTION = getattr(Config, "SNAPSHOT_RETENTION", 20)
+CURSOR_BATCH_SIZE = 1000
+
+# Fields shipped to the app. Descriptions stay out of the feed; the detail
+# screen already loads the full document from /books/<book_id>.
+FEED_FIELDS = (
+    "title",
+    "subtitle",
+    "authors",
+    "publisher",
+    "publishedDate",
+    "ISBN",
+    "pagecount",
+    "genres",
+    "mainGenre",
+    "themes",
+    "writingStyle",
+    "tone",
+    "coverImage",
+    "amazonAffiliateLink",
+    "favoriteCount",
+)
+ANALYTICS_FIELDS = FEED_FIELDS + ("description", "keywords")
+
+# Feed fields whose values are replaced by ids into a shared dictionary.
+INTERNED_FIELDS = {
+    "authors": "authors",
+    "publisher": "publishers",
+    "genres": "genres",
+    "mainGenre": "genres",
+    "themes": "themes",
+    "writingStyle": "styles",
+    "tone": "tones",
+}
+
+
+def _path(name):
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+def _read_json_gz(name):
+    path = _path(name)
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _tmp_path(name):
+    # Unique per writer, so concurrent builds and delta requests never share a file.
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=SNAPSHOT_DIR)
+    os.close(fd)
+    return tmp_path
+
+
+def _remove(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _write_json_gz(name, payload):
+    tmp_path = _tmp_path(name)
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=9) as f:
+            json.dump(payload, f, separators=(",", ":"), default=str)
+        os.replace(tmp_path, _path(name))
+    finally:
+        _remove(tmp_path)
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+@contextmanager
+def _build_lock():
+    """Serialize snapshot builds across threads and processes sharing SNAPSHOT_DIR."""
+    with open(_path(".build.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _to_json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def etag_for(version, since=None):
+    return f"catalog-v{since}-v{version}" if since is not None else f"catalog-v{version}"
+
+
+def latest_snapshot():
+    """Return the pointer to the newest snapshot ({version, etag, createdAt}) or None."""
+    path = _path("latest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class _Interner:
+    """Assigns stable ids to repeated strings; seeded from the previous snapshot."""
+
+    def __init__(self, dicts=None):
+        self.values = {name: list(values) for name, values in (dicts or {}).items()}
+        self.ids = {name: {value: i for i, value in enumerate(values)} for name, values in self.values.items()}
+
+    def intern(self, name, value):
+        if value is None:
+            return None
+        ids = self.ids.setdefault(name, {})
+        if value not in ids:
+            ids[value] = len(ids)
+            self.values.setdefault(name, []).append(value)
+        return ids[value]
+
+    def encode(self, field, value):
+        name = INTERNED_FIELDS.get(field)
+        if name is None:
+            return _to_json_value(value)
+        if isinstance(value, list):
+            return [self.intern(name, v) for v in value]
+        return self.intern(name, value)
+
+
+def _analytics_schema():
+    string_list = pa.list_(pa.string())
+    types = {
+        "authors": string_list,
+        "genres": string_list,
+        "themes": string_list,
+        "writingStyle": string_list,
+        "tone": string_list,
+        "keywords": string_list,
+        "publishedDate": pa.timestamp("ms"),
+        "pagecount": pa.string(),
+        "favoriteCount": pa.int64(),
+    }
+    fields = [pa.field("id", pa.string())]
+    fields += [pa.field(name, types.get(name, pa.string())) for name in ANALYTICS_FIELDS]
+    return pa.schema(fields)
+
+
+def _analytics_value(field, value):
+    if field == "publishedDate":
+        return value if isinstance(value, datetime) else None
+    if field == "pagecount":
+        return None if value is None else str(value)
+    if field == "favoriteCount":
+        return value if isinstance(value, int) else None
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return None if value is None else str(value)
+
+
+def build_snapshot():
+    """Stream the Books collection into a new versioned snapshot.
+
+    Writes a dictionary-encoded, gzip-compressed JSON feed, a manifest of row
+    hashes used for delta snapshots, and (when pyarrow is installed) a Parquet
+    file for analytics. Rows go to the feed as the cursor yields them; only the
+    manifest is kept in memory. If nothing changed since the latest snapshot,
+    the latest pointer is returned unchanged.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with _build_lock():
+        return _build_snapshot()
+
+
+def _build_snapshot():
+    latest = latest_snapshot()
+    previous = _read_json_gz(f"catalog-v{latest['version']}.json.gz") if latest else None
+    version = latest["version"] + 1 if latest else 1
+
+    interner = _Interner(previous["dicts"] if previous else None)
+    del previous
+    count = 0
+    manifest = {}
+    feed_tmp = _tmp_path(f"catalog-v{version}.json.gz")
+    parquet_writer = None
+    parquet_tmp = None
+    analytics_batch = []
+    if pq is not None:
+        parquet_tmp = _tmp_path(f"catalog-v{version}.parquet")
+        schema = _analytics_schema()
+        parquet_writer = pq.ParquetWriter(parquet_tmp, schema, compression="zstd")
+
+    projection = {field: 1 for field in ANALYTICS_FIELDS}
+    cursor = get_books_collection().find({}, projection).batch_size(CURSOR_BATCH_SIZE)
+    try:
+        with gzip.open(feed_tmp, "wt", encoding="utf-8", compresslevel=9) as feed:
+            # The dictionaries are only complete after the last row, so they
+            # follow the rows in the feed object.
+            header = {"version": version, "fields": ["id"] + list(FEED_FIELDS), "interned": INTERNED_FIELDS}
+            feed.write(_dumps(header)[:-1] + ',"rows":[')
+            for book in cursor:
+                book_id = str(book["_id"])
+                row = [book_id] + [interner.encode(field, book.get(field)) for field in FEED_FIELDS]
+                feed.write(("," if count else "") + _dumps(row))
+                count += 1
+                digest_source = json.dumps([row[1:], book.get("description")], default=str, sort_keys=True)
+                manifest[book_id] = hashlib.sha1(digest_source.encode("utf-8")).hexdigest()
+
+                if parquet_writer is not None:
+                    record = {"id": book_id}
+                    record.update({field: _analytics_value(field, book.get(field)) for field in ANALYTICS_FIELDS})
+                    analytics_batch.append(record)
+                    if len(analytics_batch) == CURSOR_BATCH_SIZE:
+                        parquet_writer.write_table(pa.Table.from_pylist(analytics_batch, schema=schema))
+                        analytics_batch = []
+            feed.write('],"dicts":' + _dumps(interner.values) + "}")
+            if parquet_writer is not None and analytics_batch:
+                parquet_writer.write_table(pa.Table.from_pylist(analytics_batch, schema=schema))
+        if parquet_writer is not None:
+            parquet_writer.close()
+            parquet_writer = None
+
+        previous_manifest = _read_json_gz(f"manifest-v{latest['version']}.json.gz") if latest else None
+        if previous_manifest == manifest:
+            logger.info(f"Catalog unchanged since snapshot v{latest['version']}")
+            return latest
+
+        os.replace(feed_tmp, _path(f"catalog-v{version}.json.gz"))
+        _write_json_gz(f"manifest-v{version}.json.gz", manifest)
+        if parquet_tmp is not None:
+            os.replace(parquet_tmp, _path(f"catalog-v{version}.parquet"))
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+        _remove(feed_tmp)
+        _remove(parquet_tmp)
+
+    pointer = {"version": version, "etag": etag_for(version), "createdAt": datetime.now().isoformat(), "count": count}
+    pointer_tmp = _tmp_path("latest.json")
+    try:
+        with open(pointer_tmp, "w") as f:
+            json.dump(pointer, f)
+        os.replace(pointer_tmp, _path("latest.json"))
+    finally:
+        _remove(pointer_tmp)
+    _prune_old_snapshots(version)
+    logger.info(f"Wrote catalog snapshot v{version} with {count} books")
+    return pointer
+
+
+def build_delta(since):
+    """Write (or reuse) the delta from snapshot ``since`` to the latest one.
+
+    Returns the artifact file name, or None if the base version is no longer
+    retained and the client should download the full snapshot instead.
+    """
+    latest = latest_snapshot()
+    if latest is None:
+        return None
+    version = latest["version"]
+    name = f"delta-v{since}-v{version}.json.gz"
+    if os.path.exists(_path(name)):
+        return name
+    old_manifest = _read_json_gz(f"manifest-v{since}.json.gz")
+    if old_manifest is None:
+        return None
+    new_manifest = _read_json_gz(f"manifest-v{version}.json.gz")
+    current = _read_json_gz(f"catalog-v{version}.json.gz")
+
+    changed = [row for row in current["rows"] if old_manifest.get(row[0]) != new_manifest.get(row[0])]
+    removed = [book_id for book_id in old_manifest if book_id not in new_manifest]
+    _write_json_gz(name, {
+        "version": version,
+        "since": since,
+        "fields": current["fields"],
+        "interned": current["interned"],
+        "dicts": current["dicts"],
+        "upserted": changed,
+        "removed": removed,
+    })
+    return name
+
+
+def snapshot_path(name):
+    return _path(name)
+
+
+def _prune_old_snapshots(version):
+    oldest_kept = version - SNAPSHOT_RETENTION
+    for name in os.listdir(SNAPSHOT_DIR):
+        if not name.endswith(".json.gz") and not name.endswith(".parquet"):
+            continue
+        versions = [int(part[1:]) for part in name.split(".")[0].split("-") if part[:1] == "v" and part[1:].isdigit()]
+        if versions and min(versions) <= oldest_kept:
+            os.remove(_path(name))
@@ -0,0 +1,52 @@
+"""Attribute-extraction throughput from in-process up to N NLP workers.
+
+Texts are the fixture descriptions repeated to --texts. Each worker count
+gets a fresh pool that is warmed up (models loaded) before timing.
+
+Usage (from data-scripts/):
+    python scripts/bench_nlp_pool.py --texts 2000 --workers 0 1 2 4 8 16
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import nlp_pool
+
+
+def load_texts(fixture, count):
+    with open(fixture) as f:
+        descriptions = [r["description"] for r in json.load(f)["records"] if r.get("description")]
+    return [descriptions[i % len(descriptions)] for i in range(count)]
+
+
+def main():
+    default_fixture = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "fixtures", "dedup_editions.json")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", default=default_fixture)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--workers", nargs="+", type=int, default=[0, 1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    texts = load_texts(args.fixture, args.texts)
+    print(f"{len(texts)} texts, {os.cpu_count()} CPUs")
+    print("workers  texts/s  speedup")
+    baseline = None
+    for workers in args.workers:
+        nlp_pool.configure(workers)
+        nlp_pool.warm_up()
+        started = time.perf_counter()
+        nlp_pool.extract_attributes_many(texts)
+        rate = len(texts) / (time.perf_counter() - started)
+        baseline = baseline or rate
+        label = workers if workers else "in-proc"
+        print(f"{label:>7}  {rate:7.1f}  {rate / baseline:6.2f}x")
+    nlp_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare the old jsonify path with modules.serialization on synthetic books.
+
+Usage (from data-scripts/):
+    python scripts/bench_serialization.py --sizes 10000 100000
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from flask import Flask, jsonify
+
+from modules.serialization import iter_json_array, orjson
+
+
+def make_books(count):
+    published = datetime(2026, 1, 1)
+    return [{
+        "_id": ObjectId(),
+        "title": f"Book {i}",
+        "subtitle": "A Novel",
+        "authors": ["Jane Doe", "John Roe"],
+        "publisher": "Example House",
+        "publishedDate": published + timedelta(days=i % 365),
+        "ISBN": f"978{i:010d}",
+        "pagecount": 352,
+        "genres": ["Fantasy", "Romance"],
+        "mainGenre": "Fantasy",
+        "description": "An epic tale of magic and betrayal. " * 20,
+        "coverImage": "https://books.google.com/books/content?id=abc&printsec=frontcover",
+        "amazonAffiliateLink": "https://www.amazon.com/dp/B000000000?tag=example-20",
+        "keywords": ["fantasy", "epic fantasy", "romantasy"],
+        "themes": ["Love", "Betrayal", "Magic"],
+        "writingStyle": ["Descriptive"],
+        "tone": ["Positive"],
+        "favoriteCount": i % 50,
+    } for i in range(count)]
+
+
+def old_path(app, books):
+    with app.app_context():
+        books = list(books)
+        for book in books:
+            book["_id"] = str(book["_id"])
+        return jsonify(books).get_data()
+
+
+def new_path(books):
+    return b"".join(iter_json_array(books))
+
+
+def timed(fn, repeat, setup=lambda: None):
+    best = None
+    for _ in range(repeat):
+        arg = setup()
+        started = time.perf_counter()
+        size = len(fn(arg))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    print(f"encoder: {'orjson' if orjson else 'json (orjson not installed)'}")
+    for count in args.sizes:
+        books = make_books(count)
+        # The old path mutates documents, so give it fresh copies each run.
+        old_time, old_size = timed(lambda copies: old_path(app, copies), args.repeat, lambda: copy.deepcopy(books))
+        new_time, new_size = timed(lambda _: new_path(books), args.repeat)
+        print(f"{count:>7} docs  jsonify: {old_time * 1000:8.1f} ms ({old_size / 1e6:.1f} MB)"
+              f"  chunked: {new_time * 1000:8.1f} ms ({new_size / 1e6:.1f} MB)"
+              f"  speedup: {old_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Precision/recall of the edition detector on the labelled fixture set.
+
+Records are fed in order, as the crawl would see them: each one is checked
+against the index of the records kept so far, and only records that were
+not merged are added. Title-only matches (either side has no description)
+are never merged, so they count as non-matches and are reported separately.
+
+Usage (from data-scripts/):
+    python scripts/eval_dedup.py [--fixture fixtures/dedup_editions.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.dedup import EditionIndex, DEDUP_THRESHOLD
+
+
+def evaluate(records, threshold):
+    index = EditionIndex(threshold)
+    groups = {}
+    tp = fp = fn = flagged = 0
+    for record in records:
+        match = index.find_duplicate(record["title"], record["authors"], record["description"])
+        if match and match[2]:
+            flagged += 1
+            match = None
+        has_true_duplicate = record["group"] in groups.values()
+        if match and groups[match[0]] == record["group"]:
+            tp += 1
+        elif match:
+            fp += 1
+            if has_true_duplicate:
+                fn += 1
+        elif has_true_duplicate:
+            fn += 1
+        if not match:
+            index.add(record["ISBN"], record["title"], record["authors"], record["description"])
+            groups[record["ISBN"]] = record["group"]
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return precision, recall, tp, fp, fn, flagged
+
+
+def main():
+    default_fixture = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "fixtures", "dedup_editions.json")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", default=default_fixture)
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.3, 0.4, 0.5, 0.6, 0.7, 0.8])
+    args = parser.parse_args()
+
+    with open(args.fixture) as f:
+        records = json.load(f)["records"]
+
+    print(f"{len(records)} records, default threshold {DEDUP_THRESHOLD}")
+    print("threshold  precision  recall   tp  fp  fn  title-only")
+    for threshold in args.thresholds:
+        precision, recall, tp, fp, fn, flagged = evaluate(records, threshold)
+        print(f"{threshold:9.2f}  {precision:9.2f}  {recall:6.2f}  {tp:3d} {fp:3d} {fn:3d}  {flagged:10d}")
+
+
+if __name__ == "__main__":
+    main()
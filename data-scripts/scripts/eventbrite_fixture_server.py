@@ -0,0 +1,166 @@
+"""Local stand-in for the Eventbrite organization events endpoint.
+
+Serves generated events in the API's paginated shape so the importer can be
+run without a token or network access:
+
+    python scripts/eventbrite_fixture_server.py --events 500 --port 8089
+
+then set EVENTBRITE_API_URL = "http://127.0.0.1:8089/v3" in config.py and
+call POST /import_eventbrite_events.
+
+POST /_touch?count=N marks N existing events as changed, POST /_add?count=N
+adds N new ones and POST /_cancel?count=N cancels N live ones, to exercise the
+incremental sync. Like the API, ?status= other than "all" filters the listing.
+
+Usage (from data-scripts/):
+    python scripts/eventbrite_fixture_server.py [--events 500] [--page-size 50] [--latency-ms 50]
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+EVENTS_PATH = re.compile(r"^/v3/organizations/(?P<organization>[^/]+)/events/?$")
+CITIES = [("Portland", "OR"), ("Austin", "TX"), ("Chicago", "IL"), ("Boston", "MA"), ("Denver", "CO")]
+KINDS = ["Author Talk", "Book Signing", "Poetry Reading", "Book Club", "Writing Workshop"]
+
+
+def _timestamp(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FixtureState:
+    def __init__(self, count, seed):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.events = []
+        self.add(count)
+
+    def _event(self, number):
+        rng = self.rng
+        city, region = rng.choice(CITIES)
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(days=rng.randint(0, 365), hours=rng.randint(10, 20))
+        online = rng.random() < 0.2
+        return {
+            "id": str(100000000 + number),
+            "name": {"text": f"{rng.choice(KINDS)} #{number}"},
+            "description": {"text": f"Fixture event {number} in {city}."},
+            "summary": f"Fixture event {number}.",
+            "url": f"https://www.eventbrite.com/e/{100000000 + number}",
+            "start": {"timezone": "UTC", "utc": _timestamp(start)},
+            "end": {"timezone": "UTC", "utc": _timestamp(start + timedelta(hours=2))},
+            "changed": _timestamp(datetime.now(timezone.utc)),
+            "status": "live",
+            "online_event": online,
+            "is_free": rng.random() < 0.5,
+            "logo": None,
+            "venue": None if online else {
+                "name": f"{city} Books",
+                "address": {"city": city, "region": region, "country": "US",
+                            "localized_address_display": f"1 Main St, {city}, {region}"},
+            },
+        }
+
+    def add(self, count):
+        with self.lock:
+            start = len(self.events)
+            self.events.extend(self._event(start + i) for i in range(count))
+
+    def touch(self, count):
+        # Change timestamps have one-second resolution.
+        time.sleep(1)
+        now = _timestamp(datetime.now(timezone.utc))
+        with self.lock:
+            for event in self.rng.sample(self.events, min(count, len(self.events))):
+                event["changed"] = now
+                event["summary"] = f"{event['summary']} (updated)"
+
+    def cancel(self, count):
+        time.sleep(1)
+        now = _timestamp(datetime.now(timezone.utc))
+        with self.lock:
+            live = [event for event in self.events if event["status"] == "live"]
+            for event in self.rng.sample(live, min(count, len(live))):
+                event["changed"] = now
+                event["status"] = "canceled"
+
+    def page(self, organization, page, page_size, status="all"):
+        with self.lock:
+            events = [e for e in self.events if status == "all" or e["status"] == status]
+            page_count = max(1, -(-len(events) // page_size))
+            chunk = [dict(e, organization_id=organization) for e in events[(page - 1) * page_size:page * page_size]]
+        return {
+            "pagination": {
+                "object_count": len(events),
+                "page_number": page,
+                "page_size": page_size,
+                "page_count": page_count,
+                "has_more_items": page < page_count,
+            },
+            "events": chunk,
+        }
+
+
+def make_handler(state, page_size, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            match = EVENTS_PATH.match(parsed.path)
+            if not match:
+                return self._send(404, {"error": "NOT_FOUND"})
+            time.sleep(latency)
+            query = parse_qs(parsed.query)
+            page = int(query.get("page", ["1"])[0])
+            status = query.get("status", ["all"])[0]
+            self._send(200, state.page(match["organization"], page, page_size, status))
+
+        def do_POST(self):
+            parsed = urlparse(self.path)
+            count = int(parse_qs(parsed.query).get("count", ["10"])[0])
+            if parsed.path == "/_touch":
+                state.touch(count)
+            elif parsed.path == "/_add":
+                state.add(count)
+            elif parsed.path == "/_cancel":
+                state.cancel(count)
+            else:
+                return self._send(404, {"error": "NOT_FOUND"})
+            self._send(200, {"events": len(state.events)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    state = FixtureState(args.events, args.seed)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(state, args.page_size, args.latency_ms / 1000))
+    print(f"Serving {args.events} fixture events on http://127.0.0.1:{args.port}/v3")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
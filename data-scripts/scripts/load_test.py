@@ -0,0 +1,123 @@
+"""Load-test the read endpoints and report memory per worker.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python scripts/load_test.py --base-url http://localhost:8000 --pidfile gunicorn.pid
+
+RSS counts shared pages in every worker; PSS splits them between the
+processes sharing them, so a low PSS relative to RSS means the preloaded
+models are actually shared copy-on-write.
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def read_memory_kb(pid):
+    memory = {}
+    for name, keys in (("status", ("VmRSS",)), ("smaps_rollup", ("Pss", "Shared_Clean", "Private_Dirty"))):
+        try:
+            with open(f"/proc/{pid}/{name}") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key in keys:
+                        memory[key] = int(value.split()[0])
+        except FileNotFoundError:
+            pass
+    return memory
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name is in parentheses and may contain spaces.
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (FileNotFoundError, IndexError, ValueError):
+            continue
+        if ppid == master_pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def run_load(urls, concurrency, duration):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        nonlocal errors
+        i = offset
+        while time.monotonic() < deadline:
+            url = urls[i % len(urls)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url) as response:
+                    response.read()
+                ok = True
+            except (urllib.error.URLError, ConnectionError):
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--paths", nargs="+", default=["/books"],
+                        help="Paths to request round-robin, e.g. /books /books/<id>")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--pidfile", default="gunicorn.pid")
+    args = parser.parse_args()
+
+    urls = [args.base_url.rstrip("/") + path for path in args.paths]
+    latencies, errors = run_load(urls, args.concurrency, args.duration)
+
+    report = {
+        "requests": len(latencies),
+        "errors": errors,
+        "requestsPerSecond": round(len(latencies) / args.duration, 1),
+    }
+    if latencies:
+        latencies.sort()
+        report["latencyMs"] = {
+            "p50": round(statistics.median(latencies) * 1000, 2),
+            "p95": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        }
+
+    if os.path.exists(args.pidfile):
+        with open(args.pidfile) as f:
+            master_pid = int(f.read().strip())
+        report["master"] = {"pid": master_pid, **read_memory_kb(master_pid)}
+        report["workersKb"] = [{"pid": pid, **read_memory_kb(pid)} for pid in worker_pids(master_pid)]
+    else:
+        report["workersKb"] = "pidfile not found; memory not reported"
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""Production entry point, e.g. ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+Importing the blueprints pulls in ``modules.nlp_utils``, which loads the
+spaCy and sentiment models. With ``preload_app`` that happens once in the
+master, and the forked workers share the model memory copy-on-write.
+"""
+from blueprints import create_app
+import modules.nlp_utils  # noqa: F401  (loads the NLP models before forking)
+
+app = create_app()